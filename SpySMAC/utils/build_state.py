@@ -0,0 +1,112 @@
+'''
+build_state -- bookkeeping for the incremental build of the SpySMAC report
+
+Every artifact of the report (a plot, a fANOVA analysis, index.html, the
+LaTeX report) records a hash of the inputs it was built from, the files it
+produced and, optionally, a JSON-serializable result that later invocations
+reuse instead of rebuilding the artifact.
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import json
+import hashlib
+import logging
+
+
+def _update(sha, value):
+    # NumPy arrays are hashed by their raw data, everything else as JSON
+    if hasattr(value, "tobytes") and hasattr(value, "dtype"):
+        sha.update(str((value.dtype.str, value.shape)).encode("utf-8"))
+        sha.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        sha.update(b"[")
+        for item in value:
+            _update(sha, item)
+        sha.update(b"]")
+    else:
+        sha.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+
+
+def hash_inputs(*values):
+    '''
+        returns a hash of the given values (NumPy arrays, JSON-serializable
+        objects or lists of them)
+    '''
+    sha = hashlib.sha1()
+    for value in values:
+        _update(sha, value)
+    return sha.hexdigest()
+
+
+def hash_file(path):
+    '''
+        returns a hash of the content of a file or None if it does not exist
+    '''
+    if not os.path.isfile(path):
+        return None
+    sha = hashlib.sha1()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class BuildState(object):
+    '''
+        the artifacts of the last build read from (and written to) <state_file>
+    '''
+
+    def __init__(self, state_file, force=False):
+        '''
+            Constructor
+
+            :param state_file: path to the JSON file
+            :param force: ignore the recorded state, i.e., every artifact is stale
+        '''
+        self.state_file = os.path.abspath(state_file)
+        self.artifacts = {}
+        if not force and os.path.isfile(state_file):
+            try:
+                with open(state_file) as fp:
+                    self.artifacts = json.load(fp)
+            except ValueError:
+                logging.warn("Ignoring the corrupt build state %s" % (state_file))
+
+    def fresh(self, artifact, inputs):
+        '''
+            returns True if <artifact> was built from the inputs with hash
+            <inputs> and all its files still exist
+        '''
+        entry = self.artifacts.get(artifact)
+        if entry is None or entry["inputs"] != inputs:
+            return False
+        return all(os.path.exists(path) for path in entry["outputs"])
+
+    def result(self, artifact):
+        '''
+            returns the result recorded for <artifact>
+        '''
+        return self.artifacts[artifact].get("result")
+
+    def record(self, artifact, inputs, outputs, result=None):
+        '''
+            records that <artifact> was built from the inputs with hash <inputs>;
+            the state file is updated at once, such that an interrupted build
+            keeps the artifacts it finished
+
+            :param outputs: files written for the artifact
+            :param result: JSON-serializable value returned by result()
+        '''
+        self.artifacts[artifact] = {"inputs": inputs, "result": result,
+                                    "outputs": [os.path.abspath(path) for path in outputs]}
+        self.save()
+
+    def save(self):
+        tmp_file = "%s.%d.tmp" % (self.state_file, os.getpid())
+        with open(tmp_file, "w") as fp:
+            json.dump(self.artifacts, fp, indent=1, sort_keys=True)
+        os.rename(tmp_file, self.state_file)
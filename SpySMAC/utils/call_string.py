@@ -0,0 +1,103 @@
+'''
+call_string -- precompiled call strings (--callstring) of the target algorithm
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import re
+import shlex
+
+PLACEHOLDERS = ("<instance>", "<seed>", "<params>", "<tempdir>")
+
+_placeholder_regex = re.compile("(%s)" % ("|".join(PLACEHOLDERS)))
+
+
+class CallStringTemplate(object):
+    '''
+        call string compiled into a list of argv tokens; each token is a list of
+        literal strings and placeholder slots, so that an argv list
+        can be produced in a single pass per run without re-splitting.
+        Instances of this class are never modified after construction.
+    '''
+
+    def __init__(self, binary, callstring, prefix="--", separator="="):
+        '''
+            Constructor - tokenizes the call string (with shell quoting rules)
+
+            :param binary: path to the binary of the solver (str); never split
+            :param callstring: call string with the placeholders <instance>, <seed>, <params>, <tempdir> (str)
+            :param prefix: parameter name prefix (str)
+            :param separator: separator between parameter name and value (str);
+                if it consists of whitespace only, name and value are passed as two arguments
+        '''
+        self.binary = binary
+        self.callstring = callstring
+        self.prefix = prefix
+        self.separator = separator
+        self._split_params = separator.strip() == ""
+
+        #: list of tokens; a token is a tuple of (is_slot, text) segments
+        self._tokens = []
+        for token in shlex.split(callstring):
+            segments = tuple((part in PLACEHOLDERS, part)
+                             for part in _placeholder_regex.split(token) if part)
+            self._tokens.append(segments)
+
+        self.uses_tempdir = any(is_slot and text == "<tempdir>"
+                                for token in self._tokens
+                                for is_slot, text in token)
+
+    def param_args(self, config):
+        '''
+            returns the parameters of a configuration as list of arguments
+
+            :param config: mapping param_name -> value
+        '''
+        args = []
+        for name, value in config.items():
+            if self._split_params:
+                args.append("%s%s" % (self.prefix, name))
+                args.append("%s" % (value,))
+            else:
+                args.append("%s%s%s%s" % (self.prefix, name, self.separator, value))
+        return args
+
+    def argv(self, instance, seed, config, tempdir=None):
+        '''
+            returns the argv list for a run
+
+            :param instance: path to the instance (str)
+            :param seed: seed of the run
+            :param config: mapping param_name -> value
+            :param tempdir: temporary directory of the run (only used by <tempdir>)
+        '''
+        values = {"<instance>": str(instance),
+                  "<seed>": str(seed),
+                  "<tempdir>": "" if tempdir is None else str(tempdir)}
+        params = None
+
+        argv = [self.binary]
+        for token in self._tokens:
+            if len(token) == 1 and token[0] == (True, "<params>"):
+                # a standalone <params> expands to several arguments
+                if params is None:
+                    params = self.param_args(config)
+                argv.extend(params)
+                continue
+            parts = []
+            for is_slot, text in token:
+                if not is_slot:
+                    parts.append(text)
+                elif text == "<params>":
+                    if params is None:
+                        params = self.param_args(config)
+                    parts.append(" ".join(params))
+                else:
+                    parts.append(values[text])
+            argv.append("".join(parts))
+        return argv
+
+    def __repr__(self):
+        return "%s %s" % (self.binary, self.callstring)
@@ -0,0 +1,161 @@
+'''
+cmd_builder -- registry for user-provided command line builder scripts (--cmd_builder_script)
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import imp
+import time
+import logging
+
+# stand-ins for the instance and the seed in command lines built per configuration
+INSTANCE_PLACEHOLDER = "__SPYSMAC_INSTANCE__"
+SEED_PLACEHOLDER = "__SPYSMAC_SEED__"
+
+
+class CmdBuilder(object):
+    '''
+        wraps a loaded command line builder script; the script is read,
+        compiled and executed exactly once, afterwards only
+        get_command_line_cmd is called
+    '''
+
+    def __init__(self, script, cache_size=0):
+        '''
+            Constructor - loads and validates the builder script
+
+            :param script: path to the python script (str)
+            :param cache_size: maximal number of configurations whose command
+                line is cached (0 disables the cache)
+        '''
+        self.script = os.path.abspath(script)
+        self.cache_size = cache_size
+
+        self._cache = {}  # (binary, config) -> command line with placeholders or None
+        self.num_builds = 0
+        self.num_cache_hits = 0
+        self.build_time = 0.
+
+        start = time.time()
+        module = imp.load_source("cmd_builder", self.script)
+        self.load_time = time.time() - start
+
+        get_cmd = getattr(module, "get_command_line_cmd", None)
+        if not callable(get_cmd):
+            raise ValueError("The command line builder script %s does not "
+                             "provide a function get_command_line_cmd(runargs, config)"
+                             % (self.script))
+        self._get_cmd = get_cmd
+
+        logging.debug("Loaded command line builder %s in %.4f sec"
+                      % (self.script, self.load_time))
+
+    def build(self, runargs, config):
+        '''
+            returns the command line for a run; with the cache, the command
+            line is built once per configuration with placeholders for the
+            instance and the seed, which are filled in for every run
+
+            :param runargs: dictionary with "instance", "seed" and "binary"
+            :param config: mapping param_name -> value
+        '''
+        start = time.time()
+        if self.cache_size <= 0:
+            # the builder gets its own copy, since some builders modify their input
+            cmd = self._get_cmd(dict(runargs), dict(config))
+            self._record(start)
+            return cmd
+
+        key = (runargs.get("binary"), tuple(sorted((str(k), str(v)) for k, v in config.items())))
+        if key in self._cache and self._cache[key] is not None:
+            self.num_cache_hits += 1
+            cmd = _fill(self._cache[key], runargs)
+            self._record(start)
+            return cmd
+
+        cmd = self._get_cmd(dict(runargs), dict(config))
+        if key not in self._cache:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[key] = self._template(runargs, config, cmd)
+        self._record(start)
+        return cmd
+
+    def _template(self, runargs, config, cmd):
+        '''
+            returns the command line of <config> with placeholders or None if
+            the builder does not pass the instance and the seed through
+            unchanged (i.e., the command line cannot be reused for other runs)
+        '''
+        placeholders = dict(runargs, instance=INSTANCE_PLACEHOLDER, seed=SEED_PLACEHOLDER)
+        try:
+            template = self._get_cmd(placeholders, dict(config))
+        except Exception:
+            return None
+        if _fill(template, runargs) != _fill(cmd, runargs):
+            logging.debug("The command line of %s cannot be cached" % (self.script))
+            return None
+        return template
+
+    def _record(self, start):
+        duration = time.time() - start
+        self.num_builds += 1
+        self.build_time += duration
+        logging.debug("Built command line in %.6f sec" % (duration))
+
+    def summary(self, build_times=None):
+        '''
+            returns a string with the load and build latencies
+
+            :param build_times: latencies of all builds (e.g., from the run
+                journal); the runs of SMAC are built in forked processes, so
+                the counters of this process only cover its own builds
+        '''
+        if build_times is None:
+            num_builds, build_time = self.num_builds, self.build_time
+            hits = " (%d cache hits)" % (self.num_cache_hits)
+        else:
+            num_builds, build_time = len(build_times), float(sum(build_times))
+            hits = ""
+        mean = build_time / num_builds if num_builds else 0.
+        return ("command line builder %s: loaded in %.4f sec, %d builds%s, "
+                "%.6f sec per build"
+                % (self.script, self.load_time, num_builds, hits, mean))
+
+
+def _fill(cmd, runargs):
+    # command lines are lists of arguments or strings
+    def fill(arg):
+        return str(arg).replace(INSTANCE_PLACEHOLDER, str(runargs["instance"])) \
+                       .replace(SEED_PLACEHOLDER, str(runargs["seed"]))
+    if isinstance(cmd, list):
+        return [fill(arg) for arg in cmd]
+    return fill(cmd)
+
+
+_registry = {}  # absolute script path -> CmdBuilder
+
+
+def get_cmd_builder(script, cache_size=0):
+    '''
+        returns the CmdBuilder for <script>; it is created at the first call
+        and reused afterwards
+
+        :param script: path to the python script (str)
+        :param cache_size: maximal number of configurations whose command
+            line is cached (0 disables the cache)
+        :raises ValueError: if the builder was created with another cache size
+    '''
+    path = os.path.abspath(script)
+    builder = _registry.get(path)
+    if builder is None:
+        builder = CmdBuilder(path, cache_size=cache_size)
+        _registry[path] = builder
+    elif builder.cache_size != cache_size:
+        raise ValueError("The command line builder %s was loaded with a cache "
+                         "of %d configurations, not %d"
+                         % (path, builder.cache_size, cache_size))
+    return builder
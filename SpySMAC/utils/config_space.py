@@ -270,8 +270,19 @@ class ConfigSpace(object):
         param_dict = dict((p.name,p.default) for p in self.parameters.values())
         
         #remove non-active parameters
+        return self.remove_non_active(param_dict)
+    
+    def remove_non_active(self, param_dict):
+        '''
+            removes the non-active parameters from a configuration (dict: name, value) - inplace operation!
+            
+            :param param_dict: dictionary with name -> value
+            :return: param_dict
+        '''
         for param in self.__ordered_params:
             param = self.parameters[param]
+            if param.name not in param_dict:
+                continue
             active = True
             for cond in self.conditions:
                 if param.name == cond.cond:
@@ -0,0 +1,200 @@
+'''
+core_pinning -- allocation of dedicated CPU cores to concurrent target runs
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import time
+import errno
+import fcntl
+import logging
+import multiprocessing
+
+from SpySMAC.utils.process_local import get_process_local
+
+SYSFS_CPU = "/sys/devices/system/cpu"
+
+
+def parse_cpu_list(cpu_list):
+    '''
+        parses a CPU list like "0-3,8,10-11" (as used by sysfs and taskset)
+
+        :param cpu_list: string
+        :returns: sorted list of CPU ids (int)
+    '''
+    cpus = set()
+    for part in cpu_list.strip().split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+
+def _read_sysfs(path):
+    try:
+        with open(path) as fp:
+            return fp.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def available_cpus():
+    '''
+        returns the ids of the CPUs the current process may run on
+    '''
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    online = _read_sysfs(os.path.join(SYSFS_CPU, "online"))
+    if online:
+        return parse_cpu_list(online)
+    return list(range(multiprocessing.cpu_count()))
+
+
+def cpu_topology(cpus=None):
+    '''
+        groups logical CPUs into physical cores using the SMT sibling lists of
+        sysfs; without topology information, each CPU is its own core
+
+        :param cpus: logical CPUs to consider (default: available_cpus())
+        :returns: list of cores, each a sorted list of its logical CPUs
+    '''
+    if cpus is None:
+        cpus = available_cpus()
+    cpus = set(cpus)
+    cores, seen = [], set()
+    for cpu in sorted(cpus):
+        if cpu in seen:
+            continue
+        siblings = _read_sysfs(os.path.join(SYSFS_CPU, "cpu%d" % (cpu),
+                                            "topology", "thread_siblings_list"))
+        core = [c for c in parse_cpu_list(siblings) if c in cpus] if siblings else [cpu]
+        if cpu not in core:
+            core = [cpu]
+        seen.update(core)
+        cores.append(core)
+    return cores
+
+
+class CoreAllocator(object):
+    '''
+        splits the CPUs of the machine into disjoint slots and hands them out
+        to target runs; slots are locked with lock files, such that they are
+        shared by all (forked or independent) wrapper processes using the same
+        lock directory
+    '''
+
+    def __init__(self, lock_dir, cores_per_run=1, skip_smt=False, reserved=()):
+        '''
+            Constructor
+
+            :param lock_dir: directory with one lock file per CPU
+            :param cores_per_run: number of physical cores per slot
+            :param skip_smt: use only one logical CPU per physical core; the
+                SMT siblings stay idle
+            :param reserved: CPUs that are never handed out (e.g., for SMAC)
+        '''
+        self.lock_dir = lock_dir
+        cores = [[cpu for cpu in core if cpu not in reserved]
+                 for core in cpu_topology()]
+        cores = [core for core in cores if core]
+        if skip_smt:
+            cores = [core[:1] for core in cores]
+        self.slots = [sum(cores[i:i + cores_per_run], [])
+                      for i in range(0, len(cores) - cores_per_run + 1, cores_per_run)]
+        if not self.slots:
+            raise ValueError("No CPUs left for slots of %d cores" % (cores_per_run))
+
+        if not os.path.isdir(lock_dir):
+            try:
+                os.makedirs(lock_dir)
+            except OSError:
+                # created by another process in the meantime
+                if not os.path.isdir(lock_dir):
+                    raise
+        self._fds = []
+        self.cpus = None
+
+    def acquire(self, poll_interval=0.05):
+        '''
+            blocks until a slot is free, locks it and returns its CPUs
+        '''
+        if self.cpus is not None:
+            return self.cpus
+        # different processes start at different slots to avoid contention
+        start = os.getpid() % len(self.slots)
+        while True:
+            for i in range(len(self.slots)):
+                slot = self.slots[(start + i) % len(self.slots)]
+                if self._lock(slot):
+                    self.cpus = slot
+                    return self.cpus
+            time.sleep(poll_interval)
+
+    def release(self):
+        '''
+            unlocks the slot acquired last
+        '''
+        for fd in self._fds:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._fds = []
+        self.cpus = None
+
+    def _lock(self, slot):
+        '''
+            locks all CPUs of a slot (one lock file per CPU, such that
+            processes with different slot sizes exclude each other) or none
+        '''
+        for cpu in slot:
+            fd = os.open(os.path.join(self.lock_dir, "cpu%d.lock" % (cpu)),
+                         os.O_RDWR | os.O_CREAT, 0o666)
+            # the solver must not inherit (and keep) the lock
+            fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.fcntl(fd, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError) as e:
+                os.close(fd)
+                self.release()
+                if e.errno not in (errno.EAGAIN, errno.EACCES, errno.EWOULDBLOCK):
+                    raise
+                return False
+            self._fds.append(fd)
+        return True
+
+
+def pin_command(cmd, cpus):
+    '''
+        pins a solver command (and its children) to <cpus>; with
+        os.sched_setaffinity (Python >= 3.3), the affinity is set between
+        fork and exec, otherwise the command is prefixed with taskset
+
+        :param cmd: command (list)
+        :param cpus: list of CPU ids
+        :returns: (command, preexec function or None)
+    '''
+    if hasattr(os, "sched_setaffinity"):
+        def preexec():
+            os.sched_setaffinity(0, cpus)
+        return cmd, preexec
+    from distutils.spawn import find_executable
+    taskset = find_executable("taskset")
+    if taskset is None:
+        logging.warn("Cannot pin the solver to CPUs %s: taskset not found" % (cpus))
+        return cmd, None
+    return [taskset, "-c", ",".join(str(cpu) for cpu in cpus)] + cmd, None
+
+
+def get_core_allocator(lock_dir, cores_per_run=1, skip_smt=False, reserved=()):
+    '''
+        returns the CoreAllocator of this process for <lock_dir>; a held slot
+        is not shared between forked processes
+    '''
+    return get_process_local(CoreAllocator, lock_dir, cores_per_run, skip_smt, reserved)
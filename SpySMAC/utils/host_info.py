@@ -0,0 +1,211 @@
+'''
+host_info -- hardware information for the run meta data without subprocesses
+
+Parses /proc/cpuinfo, /proc/meminfo and sysfs directly and memoizes the result
+in a per-host cache file that is valid until the next reboot (boot id), such
+that many launches on the same node do not collect the information again.
+get_cpu_info() of SpySMAC/utils/cpuinfo.py is only used if /proc is not
+available.
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import re
+import json
+import logging
+import platform
+import multiprocessing
+
+SYSFS_CPU = "/sys/devices/system/cpu"
+BOOT_ID_FILE = "/proc/sys/kernel/random/boot_id"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "spysmac")
+
+# keys of get_cpu_info() that are always present
+CPU_KEYS = ("vendor_id", "brand", "hz_advertised", "arch", "count")
+
+# platform.machine() -> (arch, bits) with the names of cpuinfo.parse_arch
+_ARCHS = {"x86_64": ("X86_64", 64), "amd64": ("X86_64", 64),
+          "i386": ("X86_32", 32), "i486": ("X86_32", 32),
+          "i586": ("X86_32", 32), "i686": ("X86_32", 32),
+          "aarch64": ("ARM_8", 64), "arm64": ("ARM_8", 64),
+          "ppc64": ("PPC_64", 64), "ppc64le": ("PPC_64", 64)}
+
+_BRAND_HZ = re.compile(r"([0-9.]+)\s*([GM])Hz", re.IGNORECASE)
+
+
+def _read_file(path):
+    try:
+        with open(path) as fp:
+            return fp.read()
+    except (IOError, OSError):
+        return None
+
+
+def _friendly_hz(hz):
+    if hz >= 1e9:
+        return "%.4f GHz" % (hz / 1e9)
+    return "%.4f MHz" % (hz / 1e6)
+
+
+def read_proc_cpuinfo(cpuinfo="/proc/cpuinfo"):
+    '''
+        returns the fields of the first processor in /proc/cpuinfo together
+        with the number of logical CPUs, cores and sockets or None if the
+        file is not available
+    '''
+    content = _read_file(cpuinfo)
+    if not content:
+        return None
+    first, processors, cores, sockets = {}, 0, set(), set()
+    for block in content.split("\n\n"):
+        fields = {}
+        for line in block.split("\n"):
+            name, sep, value = line.partition(":")
+            if sep:
+                fields[name.strip()] = value.strip()
+        if "processor" not in fields:
+            continue
+        processors += 1
+        if not first:
+            first = fields
+        cores.add((fields.get("physical id"), fields.get("core id", fields["processor"])))
+        sockets.add(fields.get("physical id"))
+    if not processors:
+        return None
+    first["#processors"] = processors
+    first["#cores"] = len(cores)
+    first["#sockets"] = len(sockets)
+    return first
+
+
+def _cache_sizes():
+    # largest cache per level as reported by sysfs for cpu0 (e.g., "32K")
+    sizes = {}
+    cache_dir = os.path.join(SYSFS_CPU, "cpu0", "cache")
+    try:
+        indices = os.listdir(cache_dir)
+    except OSError:
+        return sizes
+    for index in sorted(indices):
+        level = _read_file(os.path.join(cache_dir, index, "level"))
+        cache_type = _read_file(os.path.join(cache_dir, index, "type"))
+        size = _read_file(os.path.join(cache_dir, index, "size"))
+        if level and size and cache_type and cache_type.strip() != "Instruction":
+            sizes["l%s_cache_size" % (level.strip())] = size.strip()
+    return sizes
+
+
+def _mem_total():
+    meminfo = _read_file("/proc/meminfo") or ""
+    match = re.search(r"^MemTotal:\s*(\d+)\s*kB", meminfo, re.MULTILINE)
+    return int(match.group(1)) if match else None
+
+
+def collect_host_info():
+    '''
+        collects the hardware information from /proc and sysfs
+
+        :returns: dictionary with (at least) the keys CPU_KEYS of get_cpu_info()
+            or None if /proc/cpuinfo does not provide them
+    '''
+    fields = read_proc_cpuinfo()
+    if fields is None:
+        return None
+    brand = fields.get("model name") or fields.get("cpu")
+    vendor_id = fields.get("vendor_id") or fields.get("vendor")
+    if not brand or not vendor_id:
+        return None
+
+    hz_actual = None
+    if fields.get("cpu MHz"):
+        try:
+            hz_actual = float(fields["cpu MHz"]) * 1e6
+        except ValueError:
+            pass
+
+    # the advertised frequency is part of the brand on most x86 CPUs
+    hz_advertised = None
+    match = _BRAND_HZ.search(brand)
+    if match:
+        hz_advertised = float(match.group(1)) * (1e9 if match.group(2).upper() == "G" else 1e6)
+    else:
+        max_freq = _read_file(os.path.join(SYSFS_CPU, "cpu0", "cpufreq", "cpuinfo_max_freq"))
+        if max_freq and max_freq.strip().isdigit():
+            hz_advertised = int(max_freq) * 1e3
+        else:
+            hz_advertised = hz_actual
+
+    raw_arch_string = platform.machine()
+    arch, bits = _ARCHS.get(raw_arch_string.lower(), (raw_arch_string, None))
+
+    info = {"vendor_id": vendor_id,
+            "brand": brand,
+            "hz_advertised": _friendly_hz(hz_advertised) if hz_advertised else "0.0000 Hz",
+            "hz_actual": _friendly_hz(hz_actual) if hz_actual else "0.0000 Hz",
+            "arch": arch,
+            "bits": bits,
+            "count": multiprocessing.cpu_count(),
+            "raw_arch_string": raw_arch_string,
+            "cores": fields["#cores"],
+            "sockets": fields["#sockets"],
+            "mem_total_kb": _mem_total(),
+            "flags": sorted(fields.get("flags", fields.get("Features", "")).split())}
+    for name in ("stepping", "model", "cpu family"):
+        if fields.get(name, "").isdigit():
+            info[name.replace("cpu ", "")] = int(fields[name])
+    info.update(_cache_sizes())
+    return info
+
+
+def read_boot_id():
+    '''
+        returns the boot id of the running kernel or None (not on Linux)
+    '''
+    boot_id = _read_file(BOOT_ID_FILE)
+    return boot_id.strip() if boot_id else None
+
+
+def get_host_info(cache_dir=DEFAULT_CACHE_DIR):
+    '''
+        returns the hardware information of this host; the information is
+        read from <cache_dir>/host_info_<hostname>.json if it was stored since
+        the last boot, otherwise it is collected and stored there
+
+        :param cache_dir: directory of the cache files or None to disable the cache
+        :returns: dictionary like get_cpu_info() of cpuinfo.py plus cores,
+            sockets, cache sizes and memory if available
+    '''
+    boot_id = read_boot_id()
+    cache_file = None
+    if cache_dir is not None and boot_id is not None:
+        cache_file = os.path.join(cache_dir, "host_info_%s.json" % (platform.node() or "localhost"))
+        content = _read_file(cache_file)
+        if content:
+            try:
+                cached = json.loads(content)
+                if cached.get("boot_id") == boot_id and \
+                        all(key in cached.get("info", {}) for key in CPU_KEYS):
+                    return cached["info"]
+            except ValueError:
+                logging.debug("Ignoring corrupt host info cache %s" % (cache_file))
+
+    info = collect_host_info()
+    if info is None:
+        # slow path: other operating systems (registry, sysctl, kstat, dmesg, cpuid)
+        from SpySMAC.utils.cpuinfo import get_cpu_info
+        info = get_cpu_info()
+
+    if cache_file is not None and info is not None:
+        tmp_file = "%s.%d.tmp" % (cache_file, os.getpid())
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            with open(tmp_file, "w") as fp:
+                json.dump({"boot_id": boot_id, "info": info}, fp, sort_keys=True)
+            os.rename(tmp_file, cache_file)
+        except (IOError, OSError) as e:
+            logging.debug("Could not store the host info in %s: %s" % (cache_file, e))
+    return info
@@ -0,0 +1,153 @@
+'''
+instance_manifest -- index of the instances with file and CNF header data
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+from multiprocessing.pool import ThreadPool
+
+FIELDS = ("size", "mtime", "sha1", "num_vars", "num_clauses")
+
+
+def read_cnf_header(path, max_lines=10000):
+    '''
+        returns (#variables, #clauses) from the "p cnf" line of a (gzipped)
+        DIMACS file or (None, None) if there is no such line
+
+        :param path: path to the instance (str)
+        :param max_lines: maximal number of (comment) lines read before the header
+    '''
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as fp:
+        for i, line in enumerate(fp):
+            if i >= max_lines:
+                break
+            if line.startswith(b"c") or not line.strip():
+                continue
+            fields = line.split()
+            if len(fields) >= 4 and fields[0] == b"p" and fields[1] == b"cnf":
+                try:
+                    return int(fields[2]), int(fields[3])
+                except ValueError:
+                    pass
+            break
+    return None, None
+
+
+def file_sha1(path, chunk_size=1048576):
+    '''
+        returns the SHA-1 (hex string) of the content of a file
+    '''
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as fp:
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                break
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    return st.st_size, st.st_mtime
+
+
+def _describe(job):
+    path, size, mtime = job
+    try:
+        num_vars, num_clauses = read_cnf_header(path)
+        return path, [size, mtime, file_sha1(path), num_vars, num_clauses]
+    except (IOError, OSError) as e:
+        logging.warn("Could not read %s: %s" % (path, e))
+        return path, [size, mtime, None, None, None]
+
+
+class InstanceManifest(object):
+    '''
+        index with size, mtime, content hash and CNF header data of instances;
+        only new or modified files are hashed and parsed again
+    '''
+
+    def __init__(self, manifest_file, num_threads=16):
+        '''
+            Constructor - reads an existing manifest
+
+            :param manifest_file: path to the manifest (JSON)
+            :param num_threads: number of threads for stat and hash calls
+        '''
+        self.manifest_file = manifest_file
+        self.num_threads = num_threads
+        self.entries = {}  # path -> [size, mtime, sha1, num_vars, num_clauses]
+        self._modified = False
+
+        if os.path.isfile(manifest_file):
+            try:
+                with open(manifest_file) as fp:
+                    self.entries = json.load(fp)["instances"]
+            except (ValueError, KeyError) as e:
+                logging.warn("Ignoring corrupted instance manifest %s: %s"
+                             % (manifest_file, e))
+
+    def update(self, paths):
+        '''
+            refreshes the entries of <paths> and returns the paths that exist
+            (in the given order)
+
+            :param paths: list of instance paths (str)
+        '''
+        pool = ThreadPool(self.num_threads)
+        try:
+            stats = pool.map(_stat, paths, chunksize=64)
+
+            existing, jobs = [], []
+            for path, stat in zip(paths, stats):
+                if stat is None:
+                    continue
+                existing.append(path)
+                entry = self.entries.get(path)
+                if entry is None or entry[0] != stat[0] or entry[1] != stat[1]:
+                    jobs.append((path, stat[0], stat[1]))
+
+            if jobs:
+                logging.info("Indexing %d new or modified instances" % (len(jobs)))
+                for path, entry in pool.imap_unordered(_describe, jobs, chunksize=16):
+                    self.entries[path] = entry
+                self._modified = True
+        finally:
+            pool.close()
+            pool.join()
+        return existing
+
+    def get(self, path, field):
+        '''
+            returns a field (see FIELDS) of an instance or None if unknown
+        '''
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        return entry[FIELDS.index(field)]
+
+    def save(self):
+        '''
+            writes the manifest (atomically) if it was modified
+        '''
+        if not self._modified:
+            return
+        tmp_file = "%s.%d.tmp" % (self.manifest_file, os.getpid())
+        with open(tmp_file, "w") as fp:
+            json.dump({"fields": FIELDS, "instances": self.entries}, fp)
+        os.rename(tmp_file, self.manifest_file)
+        self._modified = False
@@ -0,0 +1,104 @@
+'''
+instance_split -- hardness-stratified training/validation splits
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import logging
+
+
+def read_default_runtimes(runtimes_file):
+    '''
+        reads the runtimes of the default configuration written by a seed-0
+        run or by the --prefilter pass (lines "instance<TAB>status<TAB>runtime");
+        unsolved instances get an infinite runtime, repeated runs are averaged
+
+        :param runtimes_file: path to the file
+        :returns: dictionary instance -> runtime
+    '''
+    runs = {}
+    with open(runtimes_file) as fp:
+        for line in fp:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) != 3:
+                continue
+            try:
+                runtime = float(fields[2]) if fields[1] in ("SAT", "UNSAT") else float("inf")
+            except ValueError:
+                continue
+            runs.setdefault(fields[0], []).append(runtime)
+    return dict((inst, sum(rts) / len(rts)) for inst, rts in runs.items())
+
+
+def stratified_split(instances, hardness, test_fraction, rng):
+    '''
+        splits instances such that training and test instances have the same
+        hardness distribution: the instances are sorted by hardness and every
+        block of consecutive instances contributes its share of test instances
+
+        :param instances: list of instance names
+        :param hardness: dictionary instance -> hardness (e.g., runtime);
+            instances without a value form their own block at the end
+        :param test_fraction: fraction of test instances
+        :param rng: random.Random (or the random module) for tie-breaking
+        :returns: (training instances, test instances)
+    '''
+    instances = list(instances)
+    # random order among instances with the same hardness
+    rng.shuffle(instances)
+    known = sorted((inst for inst in instances if inst in hardness), key=hardness.get)
+    unknown = [inst for inst in instances if inst not in hardness]
+    ordered = known + unknown
+
+    block = max(2, int(round(1. / max(min(test_fraction, 1 - test_fraction), 1e-6))))
+    train, test = [], []
+    for start in range(0, len(ordered), block):
+        members = ordered[start:start + block]
+        rng.shuffle(members)
+        num_test = int((start + len(members)) * test_fraction) - int(start * test_fraction)
+        test.extend(members[:num_test])
+        train.extend(members[num_test:])
+    rng.shuffle(train)
+    rng.shuffle(test)
+    return train, test
+
+
+def read_split(split_file):
+    '''
+        returns (training instances, test instances) of a stored split
+    '''
+    train, test = [], []
+    with open(split_file) as fp:
+        for line in fp:
+            split, _, inst = line.rstrip("\n").partition("\t")
+            (train if split == "train" else test).append(inst)
+    return train, test
+
+
+def write_split(split_file, train, test):
+    '''
+        stores a split (lines "train<TAB>instance" or "test<TAB>instance")
+    '''
+    tmp_file = "%s.%d.tmp" % (split_file, os.getpid())
+    with open(tmp_file, "w") as fp:
+        for inst in train:
+            fp.write("train\t%s\n" % (inst))
+        for inst in test:
+            fp.write("test\t%s\n" % (inst))
+    os.rename(tmp_file, split_file)
+    logging.info("Stored the training/test split in %s" % (split_file))
+
+
+def append_default_runtime(runtimes_file, instance, status, runtime):
+    '''
+        appends a run of the default configuration (see read_default_runtimes);
+        a single write with O_APPEND keeps lines of concurrent runs intact
+    '''
+    fd = os.open(runtimes_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, ("%s\t%s\t%f\n" % (instance, status, runtime)).encode("utf-8"))
+    finally:
+        os.close(fd)
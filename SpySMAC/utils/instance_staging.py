@@ -0,0 +1,202 @@
+'''
+instance_staging -- local cache of decompressed instances
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import gzip
+import fcntl
+import hashlib
+import sqlite3
+import logging
+import tempfile
+
+from SpySMAC.utils.process_local import get_process_local
+
+
+class InstanceStager(object):
+    '''
+        decompresses gzipped instances once into a (local) cache directory;
+        the decompressed files are content-addressed, i.e. duplicates are stored
+        only once, and the least recently used files are evicted if the cache
+        grows larger than its size limit; a staged file is share-locked (flock)
+        until it is released and locked files are never evicted
+    '''
+
+    def __init__(self, cache_dir, max_size_mb=10240, chunk_size=1048576):
+        '''
+            Constructor
+
+            :param cache_dir: directory for the decompressed instances (e.g. on a tmpfs)
+            :param max_size_mb: size limit of the cache in MB
+            :param chunk_size: number of bytes decompressed at once
+        '''
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 * 1024
+        self.chunk_size = chunk_size
+        self._locks = {}  # staged file -> descriptors holding a shared lock
+
+        if not os.path.isdir(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except OSError:
+                # created by another process in the meantime
+                if not os.path.isdir(cache_dir):
+                    raise
+
+        # source file (path, size, mtime) -> digest of the decompressed content
+        self._index = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), timeout=60)
+        with self._index:
+            self._index.execute("CREATE TABLE IF NOT EXISTS sources ("
+                                "path TEXT PRIMARY KEY, size INTEGER, "
+                                "mtime REAL, digest TEXT)")
+
+    def stage(self, instance):
+        '''
+            returns the path of the decompressed instance, which is locked
+            until release is called (or the process exits); instances that are
+            not gzipped are returned unchanged
+
+            :param instance: path to the instance (str)
+        '''
+        if not instance.endswith(".gz"):
+            return instance
+
+        path = os.path.abspath(instance)
+        st = os.stat(path)
+        row = self._index.execute("SELECT size, mtime, digest FROM sources "
+                                  "WHERE path=?", (path,)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime:
+            target = self._target(row[2])
+            if self._lock(target):
+                # the modification time is used for the LRU eviction
+                os.utime(target, None)
+                return target
+            logging.debug("Staged instance %s was evicted" % (target))
+
+        # a fresh file can be evicted by another process before it is locked
+        for _ in range(3):
+            digest = self._decompress(path)
+            target = self._target(digest)
+            if self._lock(target):
+                break
+        else:
+            raise IOError("Could not stage %s: all files in %s are in use"
+                          % (instance, self.cache_dir))
+        with self._index:
+            self._index.execute("INSERT OR REPLACE INTO sources VALUES (?,?,?,?)",
+                                (path, st.st_size, st.st_mtime, digest))
+        self.evict()
+        return target
+
+    def release(self, staged):
+        '''
+            releases the lock of a path returned by stage (once per call of stage)
+
+            :param staged: path returned by stage
+        '''
+        fds = self._locks.get(staged)
+        if fds:
+            os.close(fds.pop())
+
+    def evict(self):
+        '''
+            removes the least recently used instances that are not locked by
+            a run until the cache fits into its size limit
+        '''
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".cnf"):
+                continue
+            fn = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(fn)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fn))
+            total += st.st_size
+
+        for _, size, fn in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                fd = os.open(fn, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.remove(fn)
+                total -= size
+                logging.debug("Evicted staged instance %s" % (fn))
+            except (IOError, OSError):
+                # in use by a run
+                pass
+            finally:
+                os.close(fd)
+
+    def close(self):
+        self._index.close()
+
+    def _lock(self, target):
+        '''
+            share-locks <target>; returns False if it was evicted
+        '''
+        try:
+            fd = os.open(target, os.O_RDONLY)
+        except OSError:
+            return False
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        if os.fstat(fd).st_nlink == 0:
+            # removed while we waited for the lock
+            os.close(fd)
+            return False
+        self._locks.setdefault(target, []).append(fd)
+        return True
+
+    def _target(self, digest):
+        return os.path.join(self.cache_dir, "%s.cnf" % (digest))
+
+    def _decompress(self, path):
+        '''
+            decompresses <path> into the cache and returns the digest of the content
+        '''
+        sha1 = hashlib.sha1()
+        fd, tmp_fn = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                with gzip.open(path, "rb") as fp:
+                    while True:
+                        chunk = fp.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        sha1.update(chunk)
+                        out.write(chunk)
+            digest = sha1.hexdigest()
+            target = self._target(digest)
+            if os.path.exists(target):
+                # identical content was staged before
+                os.remove(tmp_fn)
+                os.utime(target, None)
+            else:
+                os.rename(tmp_fn, target)
+                logging.debug("Staged %s as %s" % (path, target))
+        except:
+            if os.path.exists(tmp_fn):
+                os.remove(tmp_fn)
+            raise
+        return digest
+
+
+def get_instance_stager(cache_dir, max_size_mb=10240):
+    '''
+        returns the InstanceStager of this process for <cache_dir>; the index
+        database and the locks are not shared between forked processes
+
+        :param cache_dir: directory for the decompressed instances
+        :param max_size_mb: size limit of the cache in MB
+    '''
+    return get_process_local(InstanceStager, cache_dir, max_size_mb)
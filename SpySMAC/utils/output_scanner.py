@@ -0,0 +1,120 @@
+'''
+output_scanner -- incremental scanner for the output of SAT solvers
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import re
+import collections
+
+# status -> regex (on a single line); the first matching line determines the status.
+# The optional "s " covers the SAT competition format and solvers like MiniSAT.
+DEFAULT_STATUS_PATTERNS = [("UNSAT", r"^(s\s+)?UNSATISFIABLE\b"),
+                           ("SAT", r"^(s\s+)?SATISFIABLE\b")]
+
+
+def parse_status_patterns(specs):
+    '''
+        parses status patterns given as "STATUS=REGEX" strings
+
+        :param specs: list of strings, e.g. ["SAT=^s SATISFIABLE"]
+        :returns: list of (status, regex) tuples
+    '''
+    patterns = []
+    for spec in specs:
+        status, sep, regex = spec.partition("=")
+        status = status.strip().upper()
+        if not sep or status not in ("SAT", "UNSAT"):
+            raise ValueError("Status pattern has to look like SAT=<regex> "
+                             "or UNSAT=<regex>: %s" % (spec))
+        re.compile(regex)
+        patterns.append((status, regex))
+    return patterns
+
+
+class OutputScanner(object):
+    '''
+        scans the output of a solver line by line while it is produced;
+        only a bounded tail of the output is kept for diagnostics
+    '''
+
+    def __init__(self, patterns=None, tail_bytes=65536, keep_model=True,
+                 max_line_bytes=4096):
+        '''
+            Constructor
+
+            :param patterns: list of (status, regex) tuples (default: DEFAULT_STATUS_PATTERNS)
+            :param tail_bytes: maximal number of bytes kept for the tail
+            :param keep_model: keep model lines ("v ...") in the tail
+            :param max_line_bytes: lines are truncated to this length before matching
+        '''
+        if patterns is None:
+            patterns = DEFAULT_STATUS_PATTERNS
+        self._patterns = [(status, re.compile(regex.encode("ascii")))
+                          for status, regex in patterns]
+        self.tail_bytes = tail_bytes
+        self.keep_model = keep_model
+        self.max_line_bytes = max_line_bytes
+
+        self.status = None
+        self.num_bytes = 0
+        self._tail = collections.deque()
+        self._tail_size = 0
+        self._partial = b""
+        self._overlong = False  # the current line exceeded max_line_bytes
+
+    def feed(self, chunk):
+        '''
+            processes a chunk of output
+
+            :param chunk: bytes
+        '''
+        self.num_bytes += len(chunk)
+        lines = chunk.split(b"\n")
+        # the last element is the (possibly empty) beginning of the next line
+        for line in lines[:-1]:
+            self._add_partial(line)
+            self._scan_line(self._partial)
+            self._partial = b""
+            self._overlong = False
+        self._add_partial(lines[-1])
+
+    def close(self):
+        '''
+            processes an unterminated last line
+        '''
+        if self._partial:
+            self._scan_line(self._partial)
+            self._partial = b""
+            self._overlong = False
+
+    def tail(self):
+        '''
+            returns the kept tail of the output (bytes)
+        '''
+        return b"\n".join(self._tail)
+
+    def _add_partial(self, data):
+        if self._overlong:
+            return
+        free = self.max_line_bytes - len(self._partial)
+        if len(data) > free:
+            data = data[:free]
+            self._overlong = True
+        self._partial += data
+
+    def _scan_line(self, line):
+        if self.status is None:
+            for status, regex in self._patterns:
+                if regex.search(line):
+                    self.status = status
+                    break
+
+        if not self.keep_model and line.startswith(b"v "):
+            return
+        self._tail.append(line)
+        self._tail_size += len(line) + 1
+        while self._tail_size > self.tail_bytes and len(self._tail) > 1:
+            self._tail_size -= len(self._tail.popleft()) + 1
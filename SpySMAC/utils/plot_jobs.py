@@ -0,0 +1,85 @@
+'''
+plot_jobs -- rendering of the report plots on a process pool
+
+A PlotJob is a module-level plotting function plus its (picklable) data; the
+function writes one image and returns its file name. Every job is rendered
+with fresh matplotlib rc settings and figures, such that jobs cannot affect
+each other, no matter whether they run in a worker process or in the calling
+process.
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import sys
+import multiprocessing
+
+
+class PlotJob(object):
+    '''
+        a call of a plotting function: data in, image file out
+    '''
+
+    def __init__(self, render, *args, **kwargs):
+        '''
+            Constructor
+
+            :param render: module-level function that writes the plot and
+                returns the name of the image
+            :param args, kwargs: arguments of <render> (must be picklable)
+        '''
+        self.render = render
+        self.args = args
+        self.kwargs = kwargs
+
+
+def run_plot_job(job):
+    '''
+        renders a PlotJob with the Agg backend and isolated matplotlib state
+    '''
+    import matplotlib
+    if "matplotlib.pyplot" not in sys.modules:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.close("all")
+    with matplotlib.rc_context():
+        try:
+            return job.render(*job.args, **job.kwargs)
+        finally:
+            plt.close("all")
+
+
+class PlotPool(object):
+    '''
+        renders PlotJobs on <num_workers> processes; with a single worker, the
+        jobs are rendered by the calling process
+    '''
+
+    def __init__(self, num_workers):
+        # the workers are forked before any fANOVA (Java) process is started
+        self._pool = multiprocessing.Pool(num_workers) if num_workers > 1 else None
+
+    def render(self, jobs):
+        '''
+            starts rendering <jobs> and returns a function that waits for them
+            and returns the names of their images (in the order of <jobs>)
+        '''
+        jobs = list(jobs)
+        if self._pool is None or len(jobs) == 0:
+            images = [run_plot_job(job) for job in jobs]
+            return lambda: images
+        result = self._pool.map_async(run_plot_job, jobs)
+        # with a timeout, Python 2 can interrupt the wait (Ctrl-C)
+        return lambda: result.get(365 * 24 * 3600)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+
+    def terminate(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
@@ -0,0 +1,153 @@
+'''
+portfolio -- greedy construction of parallel portfolios from a runtime matrix
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import ast
+import stat
+
+import numpy as np
+
+from SpySMAC.utils.output_scanner import DEFAULT_STATUS_PATTERNS, parse_status_patterns
+from SpySMAC.utils.runtime_stats import score
+from SpySMAC.utils.cmd_builder import INSTANCE_PLACEHOLDER as _INSTANCE, \
+    SEED_PLACEHOLDER as _SEED
+
+
+def portfolio_runtimes(runtimes, members):
+    '''
+        returns the runtimes of a parallel portfolio per instance, i.e. the
+        minimum over the runtimes of its members (rows of <runtimes>)
+    '''
+    return np.min(runtimes[list(members)], axis=0)
+
+
+def greedy_portfolio(runtimes, cutoff, size, factor=9):
+    '''
+        selects up to <size> configurations (rows of <runtimes>) greedily such
+        that the PAR score of running them in parallel (the virtual best of
+        the selected rows) is minimal; stops early if no configuration
+        improves the portfolio anymore
+
+        :param runtimes: numpy array (#configurations x #instances)
+        :param cutoff: runtime cutoff
+        :param size: maximal number of configurations
+        :param factor: penalty factor of timeouts (9: PAR10)
+        :returns: list of selected row indices and list of the PAR scores
+            after each selection
+    '''
+    runtimes = np.asarray(runtimes, dtype=float)
+    selected, scores = [], []
+    best = np.inf * np.ones(runtimes.shape[1])
+    for _ in range(min(size, runtimes.shape[0])):
+        # portfolio runtimes for every candidate at once
+        candidates = np.minimum(best[np.newaxis, :], runtimes)
+        candidate_scores = score(candidates, cutoff, factor)
+        candidate_scores[selected] = np.inf
+        index = int(np.argmin(candidate_scores))
+        if scores and candidate_scores[index] >= scores[-1]:
+            break
+        selected.append(index)
+        scores.append(float(candidate_scores[index]))
+        best = candidates[index]
+    return selected, scores
+
+
+def _quote(arg):
+    # always quoted, such that the placeholders can be replaced inside the quotes
+    return "'%s'" % (str(arg).replace("'", "'\"'\"'"))
+
+
+def write_launcher(launcher_file, commands, patterns=None):
+    '''
+        writes a bash script that runs the commands of all portfolio members
+        in parallel on an instance and prints the output of the first one
+        that reports SAT or UNSAT; the others are killed
+
+        :param launcher_file: path of the script
+        :param commands: list of commands (lists of arguments) with
+            placeholders returned by member_command
+        :param patterns: list of (status, regex) tuples that recognize an
+            answer (default: DEFAULT_STATUS_PATTERNS of OutputScanner); they
+            are matched with grep -P
+    '''
+    if patterns is None:
+        patterns = DEFAULT_STATUS_PATTERNS
+    # grep -P accepts a single pattern only
+    answer = _quote("|".join("(?:%s)" % (regex) for _, regex in patterns))
+    lines = ["#!/bin/bash",
+             "# parallel portfolio written by SpySMAC_analyze.py",
+             "# usage: %s <instance> [<seed>]" % (os.path.basename(launcher_file)),
+             'if [ -z "$1" ]; then echo "usage: $0 <instance> [<seed>]" >&2; exit 1; fi',
+             'INSTANCE="$1"',
+             'SEED="${2:-0}"',
+             'TMPDIR="$(mktemp -d)"',
+             "PIDS=()",
+             "trap 'kill \"${PIDS[@]}\" 2>/dev/null; rm -rf \"$TMPDIR\"' EXIT",
+             "trap 'exit 1' INT TERM",
+             ""]
+    for i, cmd in enumerate(commands):
+        args = " ".join(_quote(arg).replace(_INSTANCE, "'\"$INSTANCE\"'")
+                        .replace(_SEED, "'\"$SEED\"'") for arg in cmd)
+        lines.append('%s > "$TMPDIR/%d.out" 2>&1 &' % (args, i))
+        lines.append("PIDS+=($!)")
+    lines.extend(["",
+                  "# the first member that finishes with an answer wins",
+                  "while true; do",
+                  "    running=0",
+                  "    for i in ${!PIDS[@]}; do",
+                  '        if kill -0 ${PIDS[$i]} 2>/dev/null; then running=1; continue; fi',
+                  '        if grep -qP %s "$TMPDIR/$i.out"; then' % (answer),
+                  '            cat "$TMPDIR/$i.out"',
+                  "            wait ${PIDS[$i]}",
+                  "            exit $?",
+                  "        fi",
+                  "    done",
+                  '    if [ $running -eq 0 ]; then cat "$TMPDIR/0.out"; exit 1; fi',
+                  "    sleep 0.05",
+                  "done",
+                  ""])
+    with open(launcher_file, "w") as fp:
+        fp.write("\n".join(lines))
+    os.chmod(launcher_file, os.stat(launcher_file).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def status_patterns(meta):
+    '''
+        returns the status patterns (--status-regex) stored in the meta data
+        or the default patterns of OutputScanner if there are none
+    '''
+    try:
+        specs = ast.literal_eval(meta.get("status_regex", "[]"))
+    except (ValueError, SyntaxError):
+        specs = []
+    return parse_status_patterns(specs) if specs else DEFAULT_STATUS_PATTERNS
+
+
+def member_command(meta, config):
+    '''
+        returns the command (list of arguments) of a configuration with
+        placeholders for the instance and the seed, built like SpySMAC_run.py
+        does from its options stored in the meta data
+
+        :param meta: dictionary with the meta data (options of SpySMAC_run.py)
+        :param config: mapping param_name -> value
+    '''
+    binary = meta["binary"]
+    builder_script = meta.get("cmd_builder_script", "None")
+    if builder_script != "None":
+        from SpySMAC.utils.cmd_builder import CmdBuilder
+        cmd = CmdBuilder(builder_script).build({"instance": _INSTANCE, "seed": _SEED,
+                                                "binary": binary}, config)
+        return cmd if isinstance(cmd, list) else cmd.split()
+
+    from SpySMAC.utils.call_string import CallStringTemplate
+    template = CallStringTemplate(binary, meta.get("callstring", "<params> <instance>"),
+                                  prefix=meta.get("prefix", "--"),
+                                  separator=meta.get("separator", "="))
+    # "<tempdir>" is not supported by the launcher; the solver gets the working directory
+    return template.argv(_INSTANCE, _SEED, config, ".")
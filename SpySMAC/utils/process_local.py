@@ -0,0 +1,32 @@
+'''
+process_local -- one object per file and process
+
+The target algorithm runs are executed in forked processes (pynisher, the
+validation pool); database connections, file locks and write buffers must not
+be shared with the parent, so every process creates its own objects.
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+
+_objects = {}  # (factory, path, pid) -> object
+
+
+def get_process_local(factory, path, *args):
+    '''
+        returns the object factory(path, *args) of this process for <path>; it
+        is created at the first call in the process and reused afterwards
+        (the further arguments of later calls are ignored)
+
+        :param factory: class (or function) that creates the object
+        :param path: path of the file or directory the object is bound to
+    '''
+    key = (factory, os.path.abspath(path), os.getpid())
+    obj = _objects.get(key)
+    if obj is None:
+        obj = factory(path, *args)
+        _objects[key] = obj
+    return obj
@@ -0,0 +1,213 @@
+'''
+result_cache -- persistent store of target algorithm run results
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import json
+import hashlib
+import sqlite3
+import logging
+import multiprocessing.util
+
+from SpySMAC.utils.process_local import get_process_local
+
+SOLVED = ("SAT", "UNSAT")
+
+
+def config_hash(config):
+    '''
+        returns a stable hash (hex string) of a configuration
+
+        :param config: mapping param_name -> value
+    '''
+    items = sorted((str(k), str(v)) for k, v in config.items())
+    return hashlib.sha1(json.dumps(items).encode("utf-8")).hexdigest()
+
+
+def command_fingerprint(files, args):
+    '''
+        returns a hash (hex string) of everything besides the configuration,
+        instance and seed that determines the result of a run
+
+        :param files: files of the solver and the command line (e.g., binary,
+            cmd_builder_script); identified by path, size and modification time
+        :param args: further arguments (e.g., call string); must be JSON serializable
+    '''
+    items = []
+    for path in files:
+        if path is None:
+            items.append(None)
+            continue
+        st = os.stat(path)
+        items.append([os.path.abspath(path), st.st_size, int(st.st_mtime)])
+    return hashlib.sha1(json.dumps([items, list(args)]).encode("utf-8")).hexdigest()
+
+
+class RunResultCache(object):
+    '''
+        SQLite database with the results of (configuration, instance, seed)
+        runs; results are only reused if they are valid for the requested cutoff
+        and were observed with the same command (see command_fingerprint)
+    '''
+
+    def __init__(self, db_file, fingerprint=None, timeout=60):
+        '''
+            Constructor - opens (and creates) the database
+
+            :param db_file: path to the database file
+            :param fingerprint: command_fingerprint of the runs; stored runs of
+                another fingerprint are discarded (None: keep the stored one,
+                e.g., in worker processes)
+            :param timeout: seconds to wait for a lock held by another process
+        '''
+        self.db_file = db_file
+        self._conn = sqlite3.connect(db_file, timeout=timeout)
+        # hits and misses are written with the next store and at exit, such
+        # that lookups do not need a write transaction
+        self._counts = {"hits": 0, "misses": 0}
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS runs ("
+                               "config TEXT, instance TEXT, seed INTEGER, "
+                               "status TEXT, runtime REAL, cutoff REAL, "
+                               "PRIMARY KEY (config, instance, seed))")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS stats ("
+                               "name TEXT PRIMARY KEY, value INTEGER)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta ("
+                               "name TEXT PRIMARY KEY, value TEXT)")
+            stored = _fingerprint(self._conn)
+            if fingerprint is not None and fingerprint != stored:
+                if stored is not None:
+                    num_runs = self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+                    logging.warn("Discarding %d run results of %s: they were "
+                                 "observed with another solver or command line"
+                                 % (num_runs, db_file))
+                    self._conn.execute("DELETE FROM runs")
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)",
+                                   (fingerprint,))
+        self.fingerprint = fingerprint if fingerprint is not None else stored
+        multiprocessing.util.Finalize(self, self._flush_counts, exitpriority=10)
+
+    def lookup(self, config, instance, seed, cutoff):
+        '''
+            returns (status, runtime) of a stored run or None if no stored run
+            is valid for <cutoff>; a solved run that took longer than <cutoff>
+            is returned as a timeout, a timeout is only reused for cutoffs
+            that are not larger than the one it was observed with
+
+            :param config: mapping param_name -> value
+            :param instance: instance name (str)
+            :param seed: seed of the run (int)
+            :param cutoff: runtime cutoff of the requested run (sec)
+        '''
+        row = self._conn.execute("SELECT status, runtime, cutoff FROM runs "
+                                 "WHERE config=? AND instance=? AND seed=?",
+                                 (config_hash(config), instance, seed)).fetchone()
+        result = None
+        if row is not None:
+            status, runtime, old_cutoff = row
+            if status in SOLVED:
+                result = (status, runtime) if runtime < cutoff else ("TIMEOUT", cutoff)
+            elif cutoff <= old_cutoff:
+                result = ("TIMEOUT", cutoff)
+
+        self._counts["hits" if result is not None else "misses"] += 1
+        return result
+
+    def store(self, config, instance, seed, status, runtime, cutoff):
+        '''
+            stores the result of a run; a timeout never replaces a solved run
+            or a timeout observed with a larger cutoff
+
+            :param config: mapping param_name -> value
+            :param instance: instance name (str)
+            :param seed: seed of the run (int)
+            :param status: "SAT", "UNSAT" or "TIMEOUT"
+            :param runtime: runtime of the run (sec)
+            :param cutoff: runtime cutoff of the run (sec)
+        '''
+        with self._conn:
+            self._store((config_hash(config), instance, seed), status, runtime, cutoff)
+            self._write_counts()
+
+    def import_results(self, db_file):
+        '''
+            imports all runs of another result cache (e.g., of an earlier
+            SpySMAC run) with the same rules as store; runs observed with
+            another command (see command_fingerprint) are not imported
+
+            :param db_file: path to the other database file
+            :returns: number of runs read
+        '''
+        other = sqlite3.connect(db_file)
+        try:
+            fingerprint = _fingerprint(other)
+            if fingerprint != self.fingerprint:
+                logging.warn("Not importing the run results of %s: they were "
+                             "observed with another solver or command line" % (db_file))
+                return 0
+            rows = other.execute("SELECT config, instance, seed, status, runtime, cutoff "
+                                 "FROM runs").fetchall()
+        finally:
+            other.close()
+        with self._conn:
+            for row in rows:
+                self._store(row[:3], *row[3:])
+        return len(rows)
+
+    def hit_rate(self):
+        '''
+            returns the number of hits and misses of all processes using the
+            database (of running processes only as of their last store)
+        '''
+        self._flush_counts()
+        counts = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+        return counts.get("hits", 0), counts.get("misses", 0)
+
+    def close(self):
+        self._flush_counts()
+        self._conn.close()
+
+    def _store(self, key, status, runtime, cutoff):
+        if status not in SOLVED:
+            row = self._conn.execute("SELECT status, cutoff FROM runs "
+                                     "WHERE config=? AND instance=? AND seed=?",
+                                     key).fetchone()
+            if row is not None and (row[0] in SOLVED or row[1] >= cutoff):
+                return
+        self._conn.execute("INSERT OR REPLACE INTO runs VALUES (?,?,?,?,?,?)",
+                           tuple(key) + (status, runtime, cutoff))
+
+    def _write_counts(self):
+        for name, value in self._counts.items():
+            if value:
+                self._conn.execute("INSERT OR IGNORE INTO stats VALUES (?, 0)", (name,))
+                self._conn.execute("UPDATE stats SET value = value + ? WHERE name=?",
+                                   (value, name))
+                self._counts[name] = 0
+
+    def _flush_counts(self):
+        if any(self._counts.values()):
+            with self._conn:
+                self._write_counts()
+
+
+def _fingerprint(conn):
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE name='fingerprint'").fetchone()
+    except sqlite3.OperationalError:
+        return None  # database of an older SpySMAC version
+    return row[0] if row is not None else None
+
+
+def get_result_cache(db_file):
+    '''
+        returns the RunResultCache of this process for <db_file>; connections
+        are not shared between forked processes
+
+        :param db_file: path to the database file
+    '''
+    return get_process_local(RunResultCache, db_file)
@@ -0,0 +1,104 @@
+'''
+run_journal -- append-only journal with one JSON record per target algorithm run
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import json
+import multiprocessing.util
+
+from SpySMAC.utils.process_local import get_process_local
+
+# fields of every record and their NumPy types (see load_journal); records of
+# runs with --telemetry also have the keys of TreeSampler.summary, records of
+# pinned runs (--pin-cores) the list of their "cpus"
+FIELDS = (("config", "U40"),
+          ("instance", "U256"),
+          ("seed", "i8"),
+          ("status", "U8"),
+          ("cached", "?"),
+          ("cpu_time", "f8"),
+          ("wall_time", "f8"),
+          ("cutoff", "f8"),
+          ("builder_time", "f8"),
+          ("spawn_time", "f8"),
+          ("wait_time", "f8"),
+          ("parse_time", "f8"),
+          ("total_time", "f8"))
+
+
+class RunJournal(object):
+    '''
+        buffered writer of the run journal; complete lines are appended with a
+        single write on a file opened with O_APPEND, such that several processes
+        can share the journal
+    '''
+
+    def __init__(self, journal_file, buffer_records=64):
+        '''
+            Constructor
+
+            :param journal_file: path to the journal (JSON lines)
+            :param buffer_records: number of records that are buffered before
+                they are written
+        '''
+        self.journal_file = journal_file
+        self.buffer_records = buffer_records
+        self._buffer = []
+        # forked workers (pynisher, validation pool) exit through
+        # multiprocessing, which runs the finalizers but not atexit
+        multiprocessing.util.Finalize(self, self.flush, exitpriority=10)
+
+    def add(self, record):
+        '''
+            adds a record (dictionary with the keys of FIELDS)
+        '''
+        self._buffer.append(json.dumps(record, sort_keys=True))
+        if len(self._buffer) >= self.buffer_records:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        data = ("\n".join(self._buffer) + "\n").encode("utf-8")
+        self._buffer = []
+        fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def get_run_journal(journal_file):
+    '''
+        returns the RunJournal of this process for <journal_file>; buffers are
+        not shared between forked processes
+    '''
+    return get_process_local(RunJournal, journal_file)
+
+
+def load_journal(journal_file, offset=0):
+    '''
+        reads a run journal into a NumPy record array with the fields of
+        FIELDS; incomplete lines (e.g., of a killed process) are skipped
+
+        :param journal_file: path to the journal
+        :param offset: byte offset of the first record (e.g., the size of the
+            journal before the runs of interest)
+    '''
+    import numpy as np
+
+    names = [name for name, _ in FIELDS]
+    rows = []
+    with open(journal_file) as fp:
+        fp.seek(offset)
+        for line in fp:
+            try:
+                record = json.loads(line)
+                rows.append(tuple(record[name] for name in names))
+            except (ValueError, KeyError):
+                continue
+    return np.array(rows, dtype=list(FIELDS)).view(np.recarray)
@@ -0,0 +1,171 @@
+'''
+runtime_matrix -- validation runtimes of all SMAC runs as contiguous arrays
+
+The runtimes parsed by pysmac.analyzer.SMAC_analyzer are stored as NumPy
+arrays (one .npy file each, such that they can be memory-mapped) together with
+the few other values the analysis needs. The cache is keyed by the sizes and
+modification times of all files in the SpySMAC output directory, i.e., it is
+rebuilt as soon as a run adds or changes results.
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+
+ARRAYS = ("runtimes", "solved", "seeds", "baseline")
+KEY_FILE = "runtime_matrix.json"
+
+
+def input_key(inputdir, ignore_dirs=()):
+    '''
+        returns a hash over the relative paths, sizes and modification times of
+        all files below <inputdir>; directories in <ignore_dirs> (e.g., the
+        report and the cache) are skipped
+    '''
+    ignore_dirs = set(os.path.realpath(d) for d in ignore_dirs)
+    entries = []
+    for root, dirs, files in os.walk(inputdir):
+        dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(root, d)) not in ignore_dirs)
+        for file_ in sorted(files):
+            path = os.path.join(root, file_)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append("%s\t%d\t%d" % (os.path.relpath(path, inputdir), st.st_size,
+                                           int(st.st_mtime * 1e6)))
+    return hashlib.sha1("\n".join(entries).encode("utf-8")).hexdigest()
+
+
+def _json_value(value):
+    # NumPy scalars in the parameters of pysmac
+    if hasattr(value, "item"):
+        return value.item()
+    try:
+        json.dumps(value)
+        return value
+    except TypeError:
+        return str(value)
+
+
+class RuntimeMatrix(object):
+    '''
+        validation results of all SMAC runs of a SpySMAC output directory
+
+        runtimes: float array (#runs x #validation instances x #runs per instance)
+        solved: bool array like runtimes (runtime below the cutoff)
+        seeds: int array with the seed of each SMAC run (row)
+        baseline: float array (#validation instances x #runs per instance) of the default
+        run_ids: keys of the runs in pysmac.analyzer.SMAC_analyzer.data
+        parameters: incumbent (dictionary) of each run
+    '''
+
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.run_ids = meta["run_ids"]
+        self.parameters = meta["parameters"]
+        self.cutoff_time = meta["cutoff_time"]
+        self.overall_objective = meta["overall_objective"]
+        self.pcs_fn = meta["pcs_fn"]
+
+    def performances(self, indices):
+        '''
+            returns the runtimes of all runs on the validation instances
+            <indices> as contiguous array (#runs x #values)
+        '''
+        return np.ascontiguousarray(self.runtimes[:, indices].reshape(len(self.run_ids), -1))
+
+    def baseline_performances(self, indices):
+        '''
+            returns the runtimes of the default on the validation instances <indices>
+        '''
+        return np.ascontiguousarray(self.baseline[indices].reshape(-1))
+
+
+def build_runtime_matrix(inputdir):
+    '''
+        parses the validation results of the default and of all SMAC runs with
+        pysmac.analyzer and returns (arrays, meta) for RuntimeMatrix
+    '''
+    import pysmac.analyzer
+
+    default = pysmac.analyzer.SMAC_analyzer(os.path.join(inputdir, 'default_validation_scenario.dat'))
+    baseline = np.asarray(list(default.data[0]['test_performances']), dtype=float)
+
+    obj = pysmac.analyzer.SMAC_analyzer(inputdir)
+    run_ids = list(obj.data.keys())
+    runtimes = np.asarray([list(obj.data[i]['test_performances']) for i in run_ids], dtype=float)
+    if runtimes.ndim == 2:
+        runtimes = runtimes[:, :, np.newaxis]
+    if baseline.ndim == 1:
+        baseline = baseline[:, np.newaxis]
+
+    arrays = {"runtimes": runtimes,
+              "solved": runtimes < obj.cutoff_time,
+              "seeds": np.asarray([int(i) for i in run_ids], dtype=np.int64),
+              "baseline": baseline}
+    meta = {"run_ids": run_ids,
+            "parameters": [dict((k, _json_value(v)) for k, v in obj.data[i]['parameters'][0].items())
+                           for i in run_ids],
+            "cutoff_time": obj.cutoff_time,
+            "overall_objective": obj.overall_objective,
+            "pcs_fn": obj.pcs_fn}
+    return arrays, meta
+
+
+def load_runtime_matrix(inputdir, cache_dir=None, ignore_dirs=()):
+    '''
+        returns the RuntimeMatrix of a SpySMAC output directory; the arrays are
+        memory-mapped from <cache_dir> if the cache matches the input files,
+        otherwise they are parsed and stored there
+
+        :param inputdir: output directory of SpySMAC_run.py
+        :param cache_dir: directory of the cache or None to disable it
+        :param ignore_dirs: directories below <inputdir> that do not belong
+            to the results (e.g., the output directory of the analysis)
+    '''
+    if cache_dir is None:
+        arrays, meta = build_runtime_matrix(inputdir)
+        return RuntimeMatrix(arrays, meta)
+
+    key = input_key(inputdir, list(ignore_dirs) + [cache_dir])
+    key_file = os.path.join(cache_dir, KEY_FILE)
+    if os.path.isfile(key_file):
+        try:
+            with open(key_file) as fp:
+                meta = json.load(fp)
+            if meta.get("key") == key:
+                arrays = dict((name, np.load(os.path.join(cache_dir, "%s.npy" % (name)), mmap_mode='r'))
+                              for name in ARRAYS)
+                logging.info("Loaded the runtime matrix from %s" % (cache_dir))
+                return RuntimeMatrix(arrays, meta)
+        except (IOError, OSError, ValueError) as e:
+            logging.warn("Ignoring the runtime matrix cache in %s: %s" % (cache_dir, e))
+
+    arrays, meta = build_runtime_matrix(inputdir)
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        elif os.path.isfile(key_file):
+            os.remove(key_file)
+        for name in ARRAYS:
+            tmp_file = os.path.join(cache_dir, "%s.%d.tmp.npy" % (name, os.getpid()))
+            np.save(tmp_file, np.ascontiguousarray(arrays[name]))
+            os.rename(tmp_file, os.path.join(cache_dir, "%s.npy" % (name)))
+        # the key is written last: an interrupted update is never mistaken as valid
+        meta["key"] = key
+        tmp_file = "%s.%d.tmp" % (key_file, os.getpid())
+        with open(tmp_file, "w") as fp:
+            json.dump(meta, fp)
+        os.rename(tmp_file, key_file)
+    except (IOError, OSError) as e:
+        logging.warn("Could not store the runtime matrix in %s: %s" % (cache_dir, e))
+    return RuntimeMatrix(arrays, meta)
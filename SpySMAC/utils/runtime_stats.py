@@ -0,0 +1,71 @@
+'''
+runtime_stats -- statistics of the report computed on runtime arrays
+
+All statistics of the default (baseline) and the configured solver on one
+instance set are computed at once with NumPy; the dictionary of get_stats is
+used by the HTML, the TeX and the PDF report.
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import numpy as np
+
+
+def score(ts, cutoff, factor):
+    '''
+        returns the penalized average runtime of a runtime vector or of every
+        row of a runtime matrix; runtimes >= cutoff count (1 + <factor>) times
+        (factor 9: PAR10)
+    '''
+    ts = np.asarray(ts)
+    if len(ts.shape) == 1:
+        return(np.mean(ts + factor*ts*(ts>=cutoff)))
+    elif len(ts.shape)== 2:
+        return(np.mean(ts + factor*ts*(ts>=cutoff), axis=1))
+    else:
+        raise RuntimeError("The input data is corrupted!")
+
+
+def get_stats(baseline, configured, cutoff=300):
+    '''
+        generates a dictionary with "par1", "par10", "tos" (timeouts) for
+        "base" and "conf", the number of instances "n" and the number of
+        instances on which the configured solver is faster ("better"), as fast
+        ("equal") or slower ("worse") than the default
+
+        :param baseline: runtimes of the default (one per instance)
+        :param configured: runtimes of the configured solver (same instances)
+        :param cutoff: runtime cutoff; runtimes >= cutoff are timeouts
+    '''
+    baseline = np.asarray(baseline, dtype=float)
+    configured = np.asarray(configured, dtype=float)
+
+    stats = {"n": len(configured)}
+    for name, runtimes in [("base", baseline), ("conf", configured)]:
+        timeouts = runtimes >= cutoff
+        solved_time = runtimes[~timeouts].sum()
+        num_timeouts = int(np.count_nonzero(timeouts))
+        stats[name] = {"par1": float(solved_time + num_timeouts * cutoff) / len(runtimes),
+                       "par10": float(solved_time + num_timeouts * 10 * cutoff) / len(runtimes),
+                       "tos": num_timeouts}
+
+    better = int(np.count_nonzero(baseline > configured))
+    equal = int(np.count_nonzero(baseline == configured))
+    stats.update({"better": better, "equal": equal, "worse": len(configured) - better - equal})
+    return stats
+
+
+def get_cdf(runtimes, cutoff):
+    '''
+        returns the sorted runtimes and the fraction of instances solved up
+        to each of them; timeouts do not increase the fraction
+
+        :returns: (x, y) as NumPy arrays
+    '''
+    x = np.sort(np.asarray(runtimes, dtype=float))
+    indices = np.arange(len(x))
+    # fraction of the last solved instance, 0 before the first one
+    y = np.maximum.accumulate(np.where(x < cutoff, indices, 0)) / float(max(len(x), 1))
+    return x, y
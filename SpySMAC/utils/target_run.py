@@ -0,0 +1,239 @@
+'''
+target_run -- execution of a single target algorithm run
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import sys
+import math
+import time
+import errno
+import signal
+import resource
+import threading
+
+
+class RunUsage(object):
+    '''
+        resources used by exactly one (reaped) target algorithm process
+    '''
+
+    def __init__(self, user_time, system_time, wall_time, max_rss_kb, returncode,
+                 voluntary_ctx_switches=0, involuntary_ctx_switches=0):
+        '''
+            Constructor
+
+            :param user_time: user CPU time in sec (including reaped children of the solver)
+            :param system_time: system CPU time in sec (including reaped children of the solver)
+            :param wall_time: wall clock time in sec between start and reaping
+            :param max_rss_kb: peak resident set size in KB
+            :param returncode: exit code (negative: killed by that signal)
+            :param voluntary_ctx_switches: number of voluntary context switches
+            :param involuntary_ctx_switches: number of involuntary context switches
+        '''
+        self.user_time = user_time
+        self.system_time = system_time
+        self.wall_time = wall_time
+        self.max_rss_kb = max_rss_kb
+        self.returncode = returncode
+        self.voluntary_ctx_switches = voluntary_ctx_switches
+        self.involuntary_ctx_switches = involuntary_ctx_switches
+
+    @property
+    def cpu_time(self):
+        return self.user_time + self.system_time
+
+    def __repr__(self):
+        return ("user=%.3fs sys=%.3fs wall=%.3fs maxrss=%dKB returncode=%s"
+                % (self.user_time, self.system_time, self.wall_time,
+                   self.max_rss_kb, self.returncode))
+
+
+def resource_limiter(cpu_limit=None, mem_limit_mb=None):
+    '''
+        returns a function for the preexec_fn argument of subprocess.Popen that
+        limits the CPU time and the address space of the solver process
+
+        :param cpu_limit: CPU time limit in sec (None: unlimited)
+        :param mem_limit_mb: memory limit in MB (None: unlimited)
+    '''
+    def preexec():
+        if cpu_limit is not None:
+            # SIGXCPU at the soft limit, SIGKILL one second later
+            soft = int(math.ceil(cpu_limit))
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+        if mem_limit_mb is not None:
+            limit = int(mem_limit_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return preexec
+
+
+def group_alive(pgid):
+    '''
+        returns whether any process of the process group <pgid> is still alive
+        (zombies count as alive until they are reaped)
+    '''
+    try:
+        os.killpg(pgid, 0)
+    except OSError as e:
+        if e.errno == errno.ESRCH:
+            return False
+        # EPERM: a process of the group exists, but belongs to another user
+    return True
+
+
+def kill_process_group(pgid, grace=2.0, poll_interval=0.05):
+    '''
+        sends SIGTERM to all processes of the process group <pgid> and SIGKILL
+        to the processes that are still alive after <grace> seconds
+
+        :param pgid: process group id (the pid of the solver started with os.setsid)
+        :param grace: seconds between SIGTERM and SIGKILL
+        :returns: True if SIGKILL was necessary
+    '''
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except OSError:
+        return False
+    deadline = time.time() + grace
+    while time.time() < deadline:
+        if not group_alive(pgid):
+            return False
+        time.sleep(poll_interval)
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except OSError:
+        return False
+    return True
+
+
+def _exited(pid):
+    '''
+        returns whether <pid> is a zombie, i.e. exited but not reaped (Linux only)
+    '''
+    try:
+        with open("/proc/%d/stat" % (pid)) as fp:
+            stat = fp.read()
+    except (IOError, OSError):
+        return False
+    return stat[stat.rfind(")") + 2:].startswith("Z")
+
+
+class LeftoverWatch(object):
+    '''
+        background thread that kills the process group of a solver if its main
+        process exited, but other processes of the group still keep the output
+        pipes open (e.g., children left behind by a wrapper script)
+    '''
+
+    def __init__(self, pid, grace=2.0, interval=0.1):
+        '''
+            Constructor
+
+            :param pid: pid of the solver (and id of its process group)
+            :param grace: seconds the pipes may stay open after the solver exited
+            :param interval: seconds between two checks of the solver process
+        '''
+        self.pid = pid
+        self.grace = grace
+        self.interval = interval
+        self.killed = False
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            if _exited(self.pid):
+                if not self._done.wait(self.grace):
+                    self.killed = True
+                    try:
+                        os.killpg(self.pid, signal.SIGKILL)
+                    except OSError:
+                        pass
+                return
+
+
+def read_output(p, scanner, stderr_scanner, chunk_size=65536):
+    '''
+        reads stdout and stderr of a subprocess.Popen object in chunks until
+        both are closed and feeds them to the scanners; in contrast to
+        Popen.communicate, the output is never buffered completely and the
+        process is not reaped, such that wait_for_process can account for it
+
+        :param p: subprocess.Popen object with stdout and stderr pipes
+        :param scanner: OutputScanner for stdout
+        :param stderr_scanner: OutputScanner for stderr
+        :param chunk_size: maximal number of bytes read at once
+        :returns: seconds spent in the scanners (both pipes)
+    '''
+    parse_times = []
+
+    def drain(pipe, scanner):
+        fd = pipe.fileno()
+        parse_time = 0.
+        while True:
+            chunk = os.read(fd, chunk_size)
+            if not chunk:
+                break
+            start = time.time()
+            scanner.feed(chunk)
+            parse_time += time.time() - start
+        start = time.time()
+        scanner.close()
+        parse_times.append(parse_time + time.time() - start)
+        pipe.close()
+
+    reader = threading.Thread(target=drain, args=(p.stderr, stderr_scanner))
+    reader.daemon = True
+    reader.start()
+    drain(p.stdout, scanner)
+    reader.join()
+    return sum(parse_times)
+
+
+def wait_for_process(p, start_time):
+    '''
+        reaps the process with os.wait4 and returns the resources used by
+        exactly this process (and the children it waited for); in contrast to
+        getrusage(RUSAGE_CHILDREN), earlier runs of the same wrapper process
+        are not included
+
+        :param p: subprocess.Popen object
+        :param start_time: time.time() right before the process was started
+        :returns: RunUsage
+    '''
+    while True:
+        try:
+            _, status, rusage = os.wait4(p.pid, 0)
+            break
+        except OSError as e:
+            if e.errno != errno.EINTR:
+                raise
+    wall_time = time.time() - start_time
+
+    if os.WIFSIGNALED(status):
+        returncode = -os.WTERMSIG(status)
+    else:
+        returncode = os.WEXITSTATUS(status)
+    # the process is gone; keep Popen from waiting for it again
+    p.returncode = returncode
+
+    max_rss_kb = rusage.ru_maxrss
+    if sys.platform == "darwin":
+        # reported in bytes on OS X
+        max_rss_kb //= 1024
+
+    return RunUsage(rusage.ru_utime, rusage.ru_stime, wall_time,
+                    max_rss_kb, returncode, rusage.ru_nvcsw, rusage.ru_nivcsw)
@@ -0,0 +1,134 @@
+'''
+telemetry -- sampling of the resources used by a solver process tree
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import threading
+
+STATUS_FIELDS = {"VmRSS:": "rss_kb",
+                 "VmHWM:": "hwm_kb",
+                 "voluntary_ctxt_switches:": "voluntary_ctx_switches",
+                 "nonvoluntary_ctxt_switches:": "involuntary_ctx_switches"}
+IO_FIELDS = {"read_bytes:": "read_bytes",
+             "write_bytes:": "write_bytes"}
+COUNTERS = ("voluntary_ctx_switches", "involuntary_ctx_switches",
+            "read_bytes", "write_bytes")
+
+
+def _read_fields(path, fields):
+    values = {}
+    try:
+        with open(path) as fp:
+            for line in fp:
+                parts = line.split()
+                if parts and parts[0] in fields:
+                    values[fields[parts[0]]] = int(parts[1])
+    except (IOError, OSError, ValueError, IndexError):
+        # the process is gone or /proc/<pid>/io is not readable
+        pass
+    return values
+
+
+def _children(pid):
+    '''
+        returns the child pids of <pid> (requires /proc/<pid>/task/*/children)
+    '''
+    children = []
+    try:
+        for tid in os.listdir("/proc/%d/task" % (pid)):
+            with open("/proc/%d/task/%s/children" % (pid, tid)) as fp:
+                children.extend(int(child) for child in fp.read().split())
+    except (IOError, OSError):
+        pass
+    return children
+
+
+def process_tree(pid):
+    '''
+        returns <pid> and the pids of all its (transitive) children
+    '''
+    tree, todo = [], [pid]
+    while todo:
+        pid = todo.pop()
+        tree.append(pid)
+        todo.extend(_children(pid))
+    return tree
+
+
+class TreeSampler(object):
+    '''
+        background thread that periodically reads /proc/<pid>/status and
+        /proc/<pid>/io of all processes of a solver process tree; counters of
+        processes that exited keep the last sampled value
+    '''
+
+    def __init__(self, pid, interval=0.1):
+        '''
+            Constructor
+
+            :param pid: pid of the solver process
+            :param interval: seconds between two samples
+        '''
+        self.pid = pid
+        self.interval = interval
+        self.num_samples = 0
+        self.num_processes = 0
+        self.peak_rss_kb = 0
+        self._last = {}  # pid -> dictionary with the last sampled values
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        '''
+            stops sampling and returns the summary (see summary())
+        '''
+        self._stop.set()
+        self._thread.join()
+        return self.summary()
+
+    def sample(self):
+        '''
+            reads the current values of all processes of the tree
+        '''
+        rss = 0
+        for pid in process_tree(self.pid):
+            values = _read_fields("/proc/%d/status" % (pid), STATUS_FIELDS)
+            if not values:
+                continue
+            values.update(_read_fields("/proc/%d/io" % (pid), IO_FIELDS))
+            rss += values.get("rss_kb", 0)
+            self.peak_rss_kb = max(self.peak_rss_kb, values.get("hwm_kb", 0))
+            # a zombie has no memory and no readable io file anymore
+            self._last.setdefault(pid, {}).update(values)
+        # the summed RSS of all processes is the peak of the tree
+        self.peak_rss_kb = max(self.peak_rss_kb, rss)
+        self.num_processes = len(self._last)
+        self.num_samples += 1
+
+    def summary(self):
+        '''
+            returns a dictionary with the peak RSS (KB) of the tree, the summed
+            counters (context switches, read/write bytes) of all its processes
+            and the number of samples and processes seen
+        '''
+        summary = {"peak_rss_kb": self.peak_rss_kb,
+                   "num_samples": self.num_samples,
+                   "num_processes": self.num_processes}
+        for counter in COUNTERS:
+            summary[counter] = sum(values.get(counter, 0) for values in self._last.values())
+        return summary
+
+    def _run(self):
+        while True:
+            self.sample()
+            if self._stop.wait(self.interval):
+                break
@@ -0,0 +1,381 @@
+'''
+validation -- parallel validation of configurations on a set of instances
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import shlex
+import logging
+import multiprocessing
+
+from SpySMAC.utils.result_cache import config_hash
+
+
+def read_configuration(conf):
+    '''
+        reads a configuration from a file or a string; supported are lines
+        with "name=value" or "name value" and SMAC-style strings like
+        "-name 'value' -name2 'value2'"
+
+        :param conf: path to the file or the configuration itself (if no
+            such file exists)
+        :returns: dictionary name -> value (str)
+    '''
+    if os.path.isfile(conf):
+        with open(conf) as fp:
+            tokens = shlex.split(fp.read(), comments=True)
+    else:
+        tokens = shlex.split(conf)
+    if not tokens or (len(tokens) == 1 and "=" not in tokens[0]):
+        raise ValueError("%s is neither a configuration file nor a configuration" % (conf))
+
+    config = {}
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if "=" in token:
+            name, value = token.split("=", 1)
+            i += 1
+        elif i + 1 < len(tokens):
+            name, value = token, tokens[i+1]
+            i += 2
+        else:
+            raise ValueError("No value for parameter %s in %s" % (token, conf))
+        config[name.lstrip("-")] = value.strip("'\"")
+    return config
+
+
+def format_configuration(config):
+    '''
+        returns the SMAC-style string "-name 'value' -name2 'value2'" of a
+        configuration (the inverse of read_configuration)
+
+        :param config: mapping name -> value
+    '''
+    return " ".join("-%s '%s'" % (name, value) for name, value in sorted(config.items()))
+
+
+class ValidationResults(object):
+    '''
+        append-only text file with one line per finished run:
+        config_id, config hash, instance, seed, status, runtime, cutoff
+        (tab-separated); results of an interrupted validation are read again,
+        such that the validation can be resumed. Results are looked up by the
+        hash of the configuration and the seed, i.e., they are never reused
+        for a changed configuration or seed, even if its config_id is the same.
+    '''
+
+    def __init__(self, results_file):
+        '''
+            Constructor - reads existing results
+
+            :param results_file: path to the results file
+        '''
+        self.results_file = results_file
+        self.results = {}  # (config hash, instance, seed) -> (status, runtime, cutoff)
+
+        if os.path.isfile(results_file):
+            with open(results_file) as fp:
+                for line in fp:
+                    fields = line.rstrip("\n").split("\t")
+                    if len(fields) != 7:
+                        # e.g., the last line of an interrupted validation
+                        continue
+                    try:
+                        self.results[(fields[1], fields[2], int(fields[3]))] = \
+                            (fields[4], float(fields[5]), float(fields[6]))
+                    except ValueError:
+                        continue
+            logging.info("Read %d results from %s" % (len(self.results), results_file))
+        self._fh = open(results_file, "a")
+
+    def add(self, config_id, config, instance, seed, status, runtime, cutoff):
+        '''
+            stores (and immediately writes) the result of a run
+        '''
+        key = config_hash(config)
+        self._fh.write("%s\t%s\t%s\t%d\t%s\t%f\t%f\n"
+                       % (config_id, key, instance, seed, status, runtime, cutoff))
+        self._fh.flush()
+        self.results[(key, instance, seed)] = (status, runtime, cutoff)
+
+    def get(self, config, instance, seed):
+        return self.results.get((config_hash(config), instance, seed))
+
+    def close(self):
+        self._fh.close()
+
+
+class Validator(object):
+    '''
+        runs (configuration, instance) pairs on a local process pool; the runs
+        that are expected to take longest are started first. The pool is
+        created at the first call of run() and reused by all further calls
+        until close() is called.
+    '''
+
+    def __init__(self, run_function, results, num_procs=1, instance_sizes=None):
+        '''
+            Constructor
+
+            :param run_function: picklable function that gets a job tuple
+                (config_id, config, instance, seed, cutoff) and returns
+                (job, status, runtime)
+            :param results: ValidationResults object
+            :param num_procs: number of parallel runs
+            :param instance_sizes: mapping instance -> file size, used to order
+                runs of instances without known runtimes
+        '''
+        self.run_function = run_function
+        self.results = results
+        self.num_procs = num_procs
+        self.instance_sizes = instance_sizes if instance_sizes is not None else {}
+        self._pool = None
+        self._pool_size = 0
+        self._observed = None
+
+    def observed_runtimes(self):
+        '''
+            returns a dictionary instance -> {(config hash, seed): runtime}
+            with the runtimes observed on the instance (by any configuration);
+            built once from the results and updated with every finished run
+        '''
+        if self._observed is None:
+            self._observed = {}
+            for (key, instance, seed), (_, runtime, _) in self.results.results.items():
+                self._observed.setdefault(instance, {})[(key, seed)] = runtime
+        return self._observed
+
+    def run(self, jobs):
+        '''
+            runs all jobs that are not already part of the results and streams
+            the results to the results file
+
+            :param jobs: list of (config_id, config, instance, seed, cutoff) tuples
+        '''
+        todo = []
+        for job in jobs:
+            known = self.results.get(job[1], job[2], job[3])
+            # results obtained with a smaller cutoff are only valid if the instance was solved
+            if known is not None and (known[2] >= job[4] or known[0] in ("SAT", "UNSAT")):
+                continue
+            todo.append(job)
+        if not todo:
+            return
+
+        # instances without observed runtimes are assumed to be hard
+        observed = self.observed_runtimes()
+        def expected(job):
+            runtimes = [min(rt, job[4]) for rt in observed.get(job[2], {}).values()] or [job[4]]
+            return (sum(runtimes) / len(runtimes), self.instance_sizes.get(job[2], 0))
+        todo.sort(key=expected, reverse=True)
+        logging.info("Starting %d runs (%d already done) on %d processes"
+                     % (len(todo), len(jobs) - len(todo), self.num_procs))
+
+        if self.num_procs <= 1:
+            for job in todo:
+                self._add(*self.run_function(job))
+            return
+
+        pool = self._get_pool(min(self.num_procs, len(todo)))
+        try:
+            for result in pool.imap_unordered(self.run_function, todo):
+                self._add(*result)
+        except:
+            self.terminate()
+            raise
+
+    def _get_pool(self, size):
+        # a pool with fewer processes is replaced, a larger one is kept
+        if self._pool is not None and self._pool_size < size:
+            self.close()
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(size)
+            self._pool_size = size
+        return self._pool
+
+    def close(self):
+        '''
+            waits for the processes of the pool to exit
+        '''
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def terminate(self):
+        '''
+            stops the processes of the pool at once
+        '''
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def validate(self, configs, instances, seed, cutoff):
+        '''
+            validates all configurations on all instances
+
+            :param configs: list of (config_id, config) tuples
+            :param instances: list of instance names
+            :param seed: seed passed to the solver
+            :param cutoff: runtime cutoff (sec)
+            :returns: dictionary config_id -> list of runtimes (in the order of <instances>)
+        '''
+        jobs = [(config_id, config, instance, seed, cutoff)
+                for config_id, config in configs for instance in instances]
+        self.run(jobs)
+        runtimes = {}
+        for config_id, config in configs:
+            results = [self.results.get(config, inst, seed) for inst in instances]
+            runtimes[config_id] = [min(runtime, cutoff) if status in ("SAT", "UNSAT") else cutoff
+                                   for status, runtime, _ in results]
+        return runtimes
+
+    def _add(self, job, status, runtime):
+        config_id, config, instance, seed, cutoff = job
+        self.results.add(config_id, config, instance, seed, status, runtime, cutoff)
+        if self._observed is not None:
+            self._observed.setdefault(instance, {})[(config_hash(config), seed)] = runtime
+        logging.debug("%s on %s: %s (%.2f sec)" % (config_id, instance, status, runtime))
+
+    def validate_capped(self, configs, instances, seed, cutoff, factor=9):
+        '''
+            validates competing configurations with adaptive capping: the first
+            configuration is the reference and is validated completely; the
+            others are validated in lock-step over the instances (a round has
+            about one run per process), each run is capped at the slack of its
+            configuration to the best total PAR score before the round and a
+            configuration is dropped as soon as it cannot beat the best anymore
+
+            :param configs: list of (config_id, config) tuples; the first one is the reference
+            :param instances: list of instance names
+            :param seed: seed passed to the solver
+            :param cutoff: runtime cutoff (sec)
+            :param factor: penalty factor of timeouts (see runtime_stats.score; 9: PAR10)
+            :returns: best config_id and dictionary config_id -> PAR score
+                (None for dropped configurations)
+        '''
+        from SpySMAC.utils.runtime_stats import score
+
+        reference_id = configs[0][0]
+        runtimes = self.validate(configs[:1], instances, seed, cutoff)[reference_id]
+        scores = {reference_id: float(score(runtimes, cutoff, factor))}
+        best_id = reference_id
+        best_total = scores[reference_id] * len(instances)
+
+        totals = dict((config_id, 0.) for config_id, _ in configs[1:])
+        alive = list(configs[1:])
+        position = 0
+        while alive and position < len(instances):
+            round_instances = instances[position:position + max(1, self.num_procs // len(alive))]
+            position += len(round_instances)
+            jobs = []
+            for config_id, config in alive:
+                # a run longer than the slack cannot lead to a better total score
+                cap = min(cutoff, best_total - totals[config_id])
+                jobs.extend((config_id, config, instance, seed, cap)
+                            for instance in round_instances)
+            self.run(jobs)
+
+            still_alive = []
+            for config_id, config in alive:
+                for instance in round_instances:
+                    status, runtime, run_cutoff = self.results.get(config, instance, seed)
+                    if status in ("SAT", "UNSAT") and runtime < min(cutoff, run_cutoff):
+                        totals[config_id] += runtime
+                    elif run_cutoff >= cutoff:
+                        totals[config_id] += (1 + factor) * cutoff
+                    else:
+                        # capped before the cutoff; at least the cap was used
+                        totals[config_id] += run_cutoff
+                    if totals[config_id] >= best_total:
+                        logging.info("Dropped %s after %s: it cannot beat %s anymore"
+                                     % (config_id, instance, best_id))
+                        scores[config_id] = None
+                        break
+                else:
+                    still_alive.append((config_id, config))
+            alive = still_alive
+
+        # the remaining configurations were validated completely
+        for config_id, _ in alive:
+            scores[config_id] = totals[config_id] / float(len(instances))
+            if totals[config_id] < best_total:
+                best_id, best_total = config_id, totals[config_id]
+        return best_id, scores
+
+    def successive_halving(self, configs, instances, seed, cutoff, min_instances,
+                           min_cutoff, eta=3, num_survivors=1, factor=9):
+        '''
+            successive halving over instance subsets and cutoffs: all
+            configurations are evaluated on the first <min_instances> instances
+            with <min_cutoff>; in every further round, only the best 1/<eta> of
+            the configurations are evaluated on <eta> times more instances with
+            an <eta> times larger cutoff (runs of earlier rounds are reused if
+            they are valid for the larger cutoff)
+
+            :param configs: list of (config_id, config) tuples
+            :param instances: list of instance names (in the order of the subsets)
+            :param seed: seed passed to the solver
+            :param cutoff: maximal runtime cutoff (sec)
+            :param min_instances: number of instances in the first round
+            :param min_cutoff: runtime cutoff in the first round (sec)
+            :param eta: factor between two rounds
+            :param num_survivors: number of configurations returned
+            :param factor: penalty factor of timeouts (see runtime_stats.score; 9: PAR10)
+            :returns: list of (config_id, config, score) of the survivors
+                (best first) with their score in the last round
+        '''
+        from SpySMAC.utils.runtime_stats import score
+
+        alive = list(configs)
+        num_instances, run_cutoff = min_instances, min_cutoff
+        while True:
+            subset = instances[:max(1, min(int(num_instances), len(instances)))]
+            run_cutoff = min(run_cutoff, cutoff)
+            runtimes = self.validate(alive, subset, seed, run_cutoff)
+            scores = dict((config_id, float(score(runtimes[config_id], run_cutoff, factor)))
+                          for config_id, _ in alive)
+            alive.sort(key=lambda c: (scores[c[0]], c[0]))
+            logging.info("Successive halving: %d configurations on %d instances "
+                         "with cutoff %.2f; best %s (PAR%d %.2f)"
+                         % (len(alive), len(subset), run_cutoff, alive[0][0],
+                            factor + 1, scores[alive[0][0]]))
+
+            if len(alive) <= num_survivors or \
+                    (len(subset) == len(instances) and run_cutoff >= cutoff):
+                return [(config_id, config, scores[config_id])
+                        for config_id, config in alive[:num_survivors]]
+            alive = alive[:max(num_survivors, len(alive) // eta)]
+            num_instances *= eta
+            run_cutoff *= eta
+
+
+def classify_instances(instances, runtimes, cutoff, default_id="default", trivial_runtime=0.05):
+    '''
+        classifies instances by the runtimes of a pre-pass: instances the
+        default configuration solves within <trivial_runtime> (the runtime
+        floor of the wrapper) are "trivial", instances no configuration solves
+        within <cutoff> are "hopeless" and all others are "kept"
+
+        :param instances: list of instance names
+        :param runtimes: dictionary config_id -> list of runtimes (as returned by Validator.validate)
+        :param cutoff: runtime cutoff of the configuration (sec); unsolved
+            instances must have been run with it
+        :param default_id: config_id of the default configuration
+        :param trivial_runtime: runtime threshold for trivial instances (sec)
+        :returns: dictionary instance -> "trivial", "hopeless" or "kept"
+    '''
+    classes = {}
+    for i, instance in enumerate(instances):
+        if runtimes[default_id][i] <= trivial_runtime:
+            classes[instance] = "trivial"
+        elif all(rts[i] >= cutoff for rts in runtimes.values()):
+            classes[instance] = "hopeless"
+        else:
+            classes[instance] = "kept"
+    return classes
@@ -0,0 +1,78 @@
+'''
+warm_start -- incumbents and run results of earlier SpySMAC runs
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import re
+import logging
+
+from SpySMAC.utils.result_cache import config_hash
+
+# name='value' (optionally with a leading dash) in a line of a trajectory file
+_ASSIGNMENT = re.compile(r"-?([^\s,=']+)='([^']*)'")
+
+
+def find_trajectory_files(output_dir):
+    '''
+        returns the SMAC trajectory files (traj-run-<seed>.txt) below <output_dir>
+    '''
+    traj_files = []
+    for root, _, files in os.walk(output_dir):
+        for file_ in files:
+            if file_.startswith("traj-run-") and file_.endswith(".txt"):
+                traj_files.append(os.path.join(root, file_))
+    return sorted(traj_files)
+
+
+def read_incumbent(traj_file):
+    '''
+        returns the last incumbent of a SMAC trajectory file as dictionary
+        name -> value or None if the file has no configuration
+    '''
+    incumbent = None
+    with open(traj_file) as fp:
+        for line in fp:
+            config = dict(_ASSIGNMENT.findall(line))
+            if config:
+                incumbent = config
+    return incumbent
+
+
+def collect_incumbents(output_dirs, config_space):
+    '''
+        returns the distinct final incumbents of all SMAC runs in <output_dirs>
+        adapted to the current parameters: unknown parameters are dropped, new
+        parameters are set to their default and non-active parameters (by the
+        conditions of the current pcs file) are removed
+
+        :param output_dirs: output directories of earlier SpySMAC runs
+        :param config_space: SpySMAC.utils.config_space.ConfigSpace of the pcs file
+        :returns: list of (config_id, config) tuples
+    '''
+    incumbents = []
+    seen = set()
+    for output_dir in output_dirs:
+        traj_files = find_trajectory_files(output_dir)
+        if not traj_files:
+            logging.warn("No SMAC trajectory files found in %s" % (output_dir))
+        for traj_file in traj_files:
+            incumbent = read_incumbent(traj_file)
+            if incumbent is None:
+                continue
+            config = dict((name, incumbent.get(name, str(param.default)))
+                          for name, param in config_space.parameters.items())
+            config_space.remove_non_active(config)
+            key = config_hash(config)
+            if key in seen:
+                continue
+            seen.add(key)
+            config_id = "%s_%s" % (os.path.basename(os.path.normpath(output_dir)),
+                                   os.path.splitext(os.path.basename(traj_file))[0])
+            if config_id in [c[0] for c in incumbents]:
+                config_id = "%s_%d" % (config_id, len(incumbents))
+            incumbents.append((config_id, config))
+    return incumbents
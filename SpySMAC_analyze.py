@@ -18,6 +18,7 @@ import logging
 import os
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 import traceback
+import multiprocessing
 
 
 #adjust the PYTHON_PATH to find the submodules
@@ -27,22 +28,11 @@ sys.path =[ os.path.join(spysmac_path, "pysmac"),
             os.path.join(spysmac_path, "fanova"),
 	    os.path.join(spysmac_path, "latex_tools")] + sys.path
 
+# numpy, matplotlib, pysmac and the report generators are imported by the
+# functions that need them, such that -h and wrong arguments return at once
 
-import numpy as np
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import matplotlib.gridspec
-
-import pysmac
-import pysmac.analyzer
-import pysmac.utils
-
-from SpySMAC.utils.plot_scatter import plot_scatter_plot
-from SpySMAC.utils.html_gen import generate_html
-from SpySMAC.utils.config_space import ConfigSpace
-
-import SpySMAC_create_tex as tex_creator
+from SpySMAC.utils.instance_manifest import InstanceManifest
+from SpySMAC.utils.run_journal import load_journal
 
 #logging.basicConfig(level=logging.DEBUG)
 
@@ -58,13 +48,17 @@ def file_len(fname):
             pass
     return i + 1
 
-def score(ts, cutoff, factor):
-    if len(ts.shape) == 1:
-        return(np.mean(ts + factor*ts*(ts>=cutoff)))
-    elif len(ts.shape)== 2:
-        return(np.mean(ts + factor*ts*(ts>=cutoff), axis=1))
-    else:
-        raise RuntimeError("The input data is corrupted!")
+def import_pyplot():
+    '''
+        imports matplotlib with the Agg backend (no display needed) and returns
+        matplotlib and matplotlib.pyplot
+    '''
+    import matplotlib
+    if "matplotlib.pyplot" not in sys.modules:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import matplotlib.gridspec
+    return matplotlib, plt
 
 def parse_args(argv):
     '''Command line options.'''
@@ -108,15 +102,27 @@ USAGE
     opt_params.add_argument("-d", "--disable_fanova", action="store_true", default=False,
                             help="disables fANOVA")
     
-    opt_params.add_argument("-m", "--memlimit_fanova", default=2024,
+    opt_params.add_argument("-m", "--memlimit_fanova", default=2024, type=int,
                             help="sets memory limit in MB for fANOVA")
     
-    opt_params.add_argument("-n", "--num_params", default=10,
+    opt_params.add_argument("-n", "--num_params", default=10, type=int,
                             help="number of most important parameters in fANOVA analysis")
 
     opt_params.add_argument("-t", "--texstyle", default="article", help="imports a tex template. \n"
 			    "Usage: -t ijcai13, -t aaai or -t llncs \n")
 
+    opt_params.add_argument("-f", "--force_rebuild", action="store_true", default=False,
+                            help="rebuilds all plots, fANOVA analyses and reports, "
+                            "even if their inputs did not change since the last call")
+
+    opt_params.add_argument("-w", "--plot_workers", default=multiprocessing.cpu_count(), type=int,
+                            help="maximal number of processes that render the plots "
+                            "(at most one per plot that is rendered)")
+
+    opt_params.add_argument("-k", "--portfolio_size", default=4, type=int,
+                            help="maximal number of incumbents in the parallel portfolio "
+                            "written to portfolio.sh (0 disables the portfolio)")
+
     # Process arguments
     args = parser.parse_args(argv[1:])
 
@@ -145,6 +151,16 @@ def analyze_simulations(args):
         logging.warn("Output directory (%sPlots/) already exists; it will be overwritten." %(options['outputdir']))
     
     
+    import numpy as np
+    from SpySMAC.utils.runtime_matrix import load_runtime_matrix, input_key
+    from SpySMAC.utils.build_state import BuildState, hash_inputs, hash_file
+    from SpySMAC.utils.plot_jobs import PlotJob, PlotPool
+    from SpySMAC.utils.runtime_stats import get_stats, get_cdf, score
+
+    # artifacts whose inputs did not change are not built again
+    state = BuildState(os.path.join(options['outputdir'], "build_state.json"),
+                       force=options['force_rebuild'])
+
     # find the number of trainings and test instances
     num_train_instances = file_len(os.path.join(options['inputdir'], 'instances.dat'))
     num_test_instances = file_len(os.path.join(options['inputdir'], 'test_instances.dat')) - \
@@ -155,39 +171,25 @@ def analyze_simulations(args):
  
     
     
-    # get default performance data            
+    # get the performance data of the default and of all configuration runs
+    # (parsed once by pysmac and then memory-mapped from <outputdir>/.cache)
     try:
-        obj = pysmac.analyzer.SMAC_analyzer(os.path.join(options['inputdir'],'default_validation_scenario.dat'))      
+        obj = load_runtime_matrix(options['inputdir'], os.path.join(options['outputdir'], ".cache"),
+                                  ignore_dirs=[options['outputdir']])
     except:
         traceback.print_exc()
         print("Loading the evaluation of the default configuration failed. "
               "Most likely you did not run SpySMAC_run with --seed 0.")
+        raise
 
-    tmp = obj.data[0]['test_performances']
-    baseline_train = np.array([list(tmp[j]) for j in train_indices]).flatten()
-    baseline_test  = np.array([list(tmp[j]) for j in test_indices]).flatten()
-    
+    baseline_train = obj.baseline_performances(train_indices)
+    baseline_test  = obj.baseline_performances(test_indices)
 
-    # import the data for the configuration runs
-    obj = pysmac.analyzer.SMAC_analyzer(options['inputdir'])    
-   
-    run_ids = []
-    train_performances = []
-    test_performances  = []
-    
-    # get performance for each run
-    for i in list(obj.data.keys()):
-        tmp = obj.data[i]['test_performances']
-        
-        tmp_train = np.array([list(tmp[j]) for j in train_indices]).flatten()
-        tmp_test  = np.array([list(tmp[j]) for j in test_indices]).flatten()
-        run_ids.append(i)
-        train_performances.append(tmp_train)
-        test_performances.append(tmp_test)
+    run_ids = obj.run_ids
     
     # each ROW contains the measured performance for the instances
-    train_performances = np.array(train_performances)
-    test_performances  = np.array(test_performances)
+    train_performances = obj.performances(train_indices)
+    test_performances  = obj.performances(test_indices)
 
     # pick best run (note: it might be possible SMAC does not find anything better!)
     #timeouts = (train_performances > obj.cutoff_time)
@@ -213,38 +215,86 @@ def analyze_simulations(args):
 
     #print(json.dumps(stats, indent=2))
     
-    test_scatter_plot = get_scatter_plot(baseline_test, incumbent_test, options['outputdir'] + "/Plots", obj.cutoff_time, True)
-    train_scatter_plot = get_scatter_plot(baseline_train, incumbent_train, options['outputdir'] + "/Plots", obj.cutoff_time, False)
-
-    test_cactus_plot = get_cactus_plot(baseline_test, incumbent_test, options['outputdir'] + "/Plots", obj.cutoff_time, True)
-    train_cactus_plot = get_cactus_plot(baseline_train, incumbent_train, options['outputdir'] + "/Plots", obj.cutoff_time, False)
-
-    test_cdf_plot = get_cdf_plot(baseline_test, incumbent_test, options['outputdir'] + "/Plots", obj.cutoff_time, True)
-    train_cdf_plot = get_cdf_plot(baseline_train, incumbent_train, options['outputdir'] + "/Plots", obj.cutoff_time, False)
-
-    if options["disable_fanova"]:
-        p_not_imps, p_def_imps, fanova_def_plots, fanova_not_plots = [], [], [], []
-    else:
-        # read configspace
-        cs = ConfigSpace(obj.pcs_fn)
+    plot_dir = options['outputdir'] + "/Plots"
+    plot_files = {}
+    # the reports embed the plots, i.e., they depend on the inputs of the plots
+    plot_inputs = []
+    stale_plots = []
+    for kind, get_plot in [("scatter", get_scatter_plot), ("cactus", get_cactus_plot), ("cdf", get_cdf_plot)]:
+        for split, baseline, configured in [("test", baseline_test, incumbent_test),
+                                            ("train", baseline_train, incumbent_train)]:
+            inputs = hash_inputs(kind, split, baseline, configured, obj.cutoff_time)
+            plot_inputs.append(inputs)
+            artifact = "%s_%s" %(kind, split)
+            if state.fresh(artifact, inputs):
+                plot_files[(kind, split)] = state.result(artifact)
+            else:
+                stale_plots.append(((kind, split), artifact, inputs,
+                                    PlotJob(get_plot, baseline, configured, plot_dir,
+                                            obj.cutoff_time, split == "test")))
+
+    # all plots are rendered by a pool of worker processes; the pool is
+    # started before fANOVA, which keeps working in this process meanwhile
+    max_jobs = len(stale_plots) + (0 if options["disable_fanova"] else options["num_params"])
+    pool = PlotPool(min(options['plot_workers'], max_jobs))
+    try:
+        wait_for_plots = pool.render([job for _, _, _, job in stale_plots])
 
-        # fANOVA        
-        try:
-            p_not_imps, fanova_not_plots = get_fanova(obj.get_pyfanova_obj(check_scenario_files = False, improvement_over="NOTHING", heap_size = options['memlimit_fanova']), 
-                                      cs, options['outputdir'] + "/Plots", improvement_over="NOTHING", num_params=options["num_params"])
-        except:
-            #traceback.print_exc()
-            logging.warn("fANOVA (without capping) failed")
-            p_not_imps, fanova_not_plots = [],[]
-    
-        try:
-            p_def_imps, fanova_def_plots = get_fanova(obj.get_pyfanova_obj(check_scenario_files = False, improvement_over="DEFAULT", heap_size = options['memlimit_fanova']), 
-                                      cs, options['outputdir'] + "/Plots", improvement_over="DEFAULT", num_params=options["num_params"])
-        except:
-            #traceback.print_exc()
-            logging.warn("fANOVA (with capping at default performance) failed")
-            p_def_imps, fanova_def_plots = [],[]
+        if options["disable_fanova"]:
+            p_not_imps, p_def_imps, fanova_def_plots, fanova_not_plots = [], [], [], []
+        else:
+            # read configspace
+            from SpySMAC.utils.config_space import ConfigSpace
+            cs = ConfigSpace(obj.pcs_fn)
+
+            # fANOVA needs all runs of SMAC, not only the validation results;
+            # they are parsed only if one of the analyses is out of date
+            analyzers = []
+            def fanova(improvement_over):
+                if not analyzers:
+                    import pysmac.analyzer
+                    analyzers.append(pysmac.analyzer.SMAC_analyzer(options['inputdir']))
+                most_important, plots, jobs = get_fanova(analyzers[0].get_pyfanova_obj(check_scenario_files = False, improvement_over=improvement_over, heap_size = options['memlimit_fanova']), 
+                                                         cs, plot_dir, improvement_over=improvement_over, num_params=options["num_params"])
+                pool.render(jobs)()
+                return most_important, plots
+
+            fanova_inputs = [input_key(options['inputdir'], [options['outputdir']]), hash_file(obj.pcs_fn),
+                             options['memlimit_fanova'], options['num_params']]
+            plot_inputs.append(hash_inputs(fanova_inputs))
+            fanova_outputs = lambda result: [os.path.join(plot_dir, plot) for plot in result[1]]
+
+            # fANOVA        
+            try:
+                p_not_imps, fanova_not_plots = build_artifact(
+                    state, "fanova_NOTHING", hash_inputs("NOTHING", fanova_inputs), fanova_outputs,
+                    lambda: fanova("NOTHING"))
+            except:
+                #traceback.print_exc()
+                logging.warn("fANOVA (without capping) failed")
+                p_not_imps, fanova_not_plots = [],[]
+        
+            try:
+                p_def_imps, fanova_def_plots = build_artifact(
+                    state, "fanova_DEFAULT", hash_inputs("DEFAULT", fanova_inputs), fanova_outputs,
+                    lambda: fanova("DEFAULT"))
+            except:
+                #traceback.print_exc()
+                logging.warn("fANOVA (with capping at default performance) failed")
+                p_def_imps, fanova_def_plots = [],[]
+
+        for (key, artifact, inputs, _), plot in zip(stale_plots, wait_for_plots()):
+            state.record(artifact, inputs, [os.path.join(plot_dir, plot)], plot)
+            plot_files[key] = plot
+    except:
+        pool.terminate()
+        raise
+    pool.close()
     
+    test_scatter_plot, train_scatter_plot = plot_files[("scatter", "test")], plot_files[("scatter", "train")]
+    test_cactus_plot, train_cactus_plot = plot_files[("cactus", "test")], plot_files[("cactus", "train")]
+    test_cdf_plot, train_cdf_plot = plot_files[("cdf", "test")], plot_files[("cdf", "train")]
+
     plots = {"scatter": {"test" : test_scatter_plot, "train" : train_scatter_plot}, 
              "cactus": {"test" : test_cactus_plot, "train" : train_cactus_plot},
              "cdf": {"test" : test_cdf_plot, "train" : train_cdf_plot},
@@ -257,19 +307,32 @@ def analyze_simulations(args):
     
     read_meta, solver_name = get_meta_data(options['inputdir'])
     meta.extend(read_meta)
+    meta.extend(get_instance_meta_data(options['inputdir'], read_meta,
+                                       num_train_instances, num_test_instances))
+    meta.extend(get_journal_meta_data(options['inputdir']))
+    if options['portfolio_size'] > 0:
+        meta.extend(get_portfolio(obj, run_ids, train_performances, test_performances,
+                                  dict(read_meta), options['portfolio_size'], factor,
+                                  options['outputdir']))
 
     if solver_name is None:
         solver_name = "UNKNOWN"
     
-    generate_html(solver_name=solver_name, 
+    report_inputs = [solver_name, meta, obj.parameters[best_train_run_num], test_stats, training_stats,
+                     p_def_imps, p_not_imps, plots, plot_inputs]
+
+    from SpySMAC.utils.html_gen import generate_html
+    build_artifact(state, "html", hash_inputs(report_inputs),
+                   [os.path.join(options['outputdir'], "index.html")],
+                   lambda: generate_html(solver_name=solver_name, 
                   meta=meta, 
-                  incumbent=obj.data[i]['parameters'][0],
+                  incumbent=obj.parameters[best_train_run_num],
                   test_perf=test_stats,
                   training_perf=training_stats, 
                   param_imp_def=p_def_imps,
                   param_imp_not=p_not_imps, 
                   plots=plots, 
-                  out_dir=options['outputdir'])
+                  out_dir=options['outputdir']))
     
     # First pdf generator
     """             
@@ -279,7 +342,7 @@ def analyze_simulations(args):
         SpySMAC.utils.pdf_generator.generate_pdf(
             solver_name=solver_name, 
             meta=meta, 
-            incumbent=obj.data[i]['parameters'][0],
+            incumbent=obj.parameters[best_train_run_num],
             test_perf=test_stats,
             training_perf=training_stats, 
             param_imp_def=p_def_imps,
@@ -294,17 +357,24 @@ def analyze_simulations(args):
     """
 
     # Prepares the runtime data for the cumulative distribution function plots
-    cdf_values_baseline_training  = get_cdf_x_y(baseline_train, obj.cutoff_time);
-    cdf_values_incumbent_training = get_cdf_x_y(incumbent_train, obj.cutoff_time);
+    cdf_values_baseline_training  = get_cdf(baseline_train, obj.cutoff_time)
+    cdf_values_incumbent_training = get_cdf(incumbent_train, obj.cutoff_time)
 
-    cdf_values_baseline_test  = get_cdf_x_y(baseline_test, obj.cutoff_time);
-    cdf_values_incumbent_test = get_cdf_x_y(incumbent_test, obj.cutoff_time);
+    cdf_values_baseline_test  = get_cdf(baseline_test, obj.cutoff_time)
+    cdf_values_incumbent_test = get_cdf(incumbent_test, obj.cutoff_time)
 
 
     # Second pdf generator and tex file generator 
-    tex_creator.SpySMAC_create_tex(solver_name=solver_name, 
+    import SpySMAC_create_tex as tex_creator
+    report_file = os.path.abspath(os.path.join(options['outputdir'], "SpySMACReport"))
+    build_artifact(state, "tex",
+                   hash_inputs(report_inputs, baseline_train, baseline_test, incumbent_train,
+                               incumbent_test, options['texstyle']),
+                   # without pdflatex, only the .tex file is built
+                   lambda _: [f for f in [report_file + ".tex", report_file + ".pdf"] if os.path.exists(f)],
+                   lambda: tex_creator.SpySMAC_create_tex(solver_name=solver_name, 
                   meta=meta, 
-                  incumbent=obj.data[i]['parameters'][0],
+                  incumbent=obj.parameters[best_train_run_num],
                   test_perf=test_stats,
                   baseline_train=baseline_train,
                   baseline_test=baseline_test,
@@ -319,31 +389,31 @@ def analyze_simulations(args):
 		  cdf_values_baseline_training  = cdf_values_baseline_training,
 		  cdf_values_incumbent_training = cdf_values_incumbent_training,
 		  cdf_values_baseline_test  = cdf_values_baseline_test,
-		  cdf_values_incumbent_test = cdf_values_incumbent_test)
+		  cdf_values_incumbent_test = cdf_values_incumbent_test))
     
     
-def get_stats(baseline, configured, cutoff=300):
+def build_artifact(state, artifact, inputs, outputs, build):
     '''
-         generates a dictionary with par1", "par10", "tos" for "base" and "conf"
+        returns the result of build() and records it in the BuildState <state>,
+        or returns the recorded result if <artifact> was already built from the
+        same <inputs> (hash)
+
+        :param outputs: files of the artifact or a function that returns them
+            given the result of build()
     '''
-    stats = {"base": {
-                      "par1": sum([cutoff if x >= cutoff else x for x in baseline]) / len(baseline),
-                      "par10": sum([10*cutoff if x >= cutoff else x for x in baseline]) / len(baseline),
-                      "tos": sum([1 if x >= cutoff else 0 for x in baseline]),
-                      },
-             "conf": {
-                      "par1": sum([cutoff if x >= cutoff else x for x in configured]) / len(configured),
-                      "par10": sum([10*cutoff if x >= cutoff else x for x in configured]) / len(configured),
-                      "tos": sum([1 if x >= cutoff else 0 for x in configured]),
-                      },
-             "n" :  len(configured)
-             }
-    return stats
+    if state.fresh(artifact, inputs):
+        logging.info("%s is up to date" %(artifact))
+        return state.result(artifact)
+    result = build()
+    state.record(artifact, inputs, outputs(result) if callable(outputs) else outputs, result)
+    return result
 
 def get_scatter_plot(baseline, configured, out_dir, cutoff, test=True):
     '''
         generate scatter plot
     '''
+    import_pyplot()
+    from SpySMAC.utils.plot_scatter import plot_scatter_plot
     if test:
         out_file = os.path.join(out_dir, "scatter_test.png")
         title = "Test Instances"
@@ -363,6 +433,8 @@ def get_cactus_plot(baseline, configured, out_dir, cutoff, test=True):
         generate cactus plot
     '''
     #TODO: READ cutoff from somewhere
+    import numpy as np
+    matplotlib, plt = import_pyplot()
     
     user_fontsize=20
     
@@ -410,6 +482,7 @@ def get_cdf_plot(baseline, configured, out_dir, cutoff, test=True):
         generate cactus plot
     '''
     #TODO: READ cutoff from somewhere
+    matplotlib, plt = import_pyplot()
     
     user_fontsize=20
     
@@ -426,13 +499,11 @@ def get_cdf_plot(baseline, configured, out_dir, cutoff, test=True):
     #baseline = filter(lambda x: True if x < cutoff else False, baseline)
     #configured = filter(lambda x: True if x < cutoff else False, configured)
                 
-    #print(get_cdf_x_y(baseline, cutoff))
-    #print(get_cdf_x_y(configured, cutoff))
-                
-    #print(get_cdf_x_y(baseline, cutoff)[1])
-    #print(get_cdf_x_y(baseline, cutoff)[0])
-    ax1.step(get_cdf_x_y(baseline, cutoff)[0], get_cdf_x_y(baseline, cutoff)[1], label="Default")
-    ax1.step(get_cdf_x_y(configured, cutoff)[0], get_cdf_x_y(configured, cutoff)[1], color='r', label="Configured")
+    from SpySMAC.utils.runtime_stats import get_cdf
+    baseline_x, baseline_y = get_cdf(baseline, cutoff)
+    configured_x, configured_y = get_cdf(configured, cutoff)
+    ax1.step(baseline_x, baseline_y, label="Default")
+    ax1.step(configured_x, configured_y, color='r', label="Configured")
 
     ax1.grid(True, linestyle='-', which='major', color='lightgrey', alpha=0.5)
     ax1.set_xlabel("Runtime [sec]")
@@ -457,17 +528,6 @@ def get_cdf_plot(baseline, configured, out_dir, cutoff, test=True):
     else:
         return "cdf_train.png"
 
-def get_cdf_x_y(data, cutoff):
-    b_x, b_y, i_s = [], [], 0
-    for i, x in enumerate(np.sort(data)):
-        b_x.append(x)
-        if x < cutoff:
-            b_y.append(float(i) /len(data))
-            i_s = i
-        else: 
-            b_y.append(float(i_s) /len(data))
-    return b_x, b_y     
-
 def get_fanova(pyfanova, cs, out_dir, improvement_over="DEFAULT", num_params=10):
     ''' generate parameter importance via fANOVA 
         Args:
@@ -476,42 +536,63 @@ def get_fanova(pyfanova, cs, out_dir, improvement_over="DEFAULT", num_params=10)
             out_dir: Output directory
             improvement_over: capping of fANOVA ("DEFAUL" or "NONE")
             num_params: number of most important parameters to return 
+        Returns:
+            the most important parameters, the names of their plots and the
+            PlotJobs that still have to render (some of) these plots
     '''
     
-    from pyfanova.visualizer import Visualizer
+    from SpySMAC.utils.plot_jobs import PlotJob
     
     most_important = get_fanova_marginals(pyfanova, max_num=num_params)
     
     
-    vis = Visualizer(pyfanova)
+    vis = None
     
     config_space = pyfanova.get_config_space()
     cat_params = config_space.get_categorical_parameters()
     int_params = config_space.get_integer_parameters()
     cont_params = config_space.get_continuous_parameters()
     
-    plots = []
+    plots, jobs = [], []
     #print(most_important)
     for _,p in most_important:
         
-        fig = plt.figure()
-        
         log_scale = cs.parameters[p].logged
         
+        out_name = "%s_fanova_over_%s.png" %(p, improvement_over)
+        out_file = os.path.join(out_dir, out_name)
+        
+        if p not in cat_params and p not in int_params and p not in cont_params:
+            logging.error("something went wrong with {}".format(p))
+            continue
+        
+        # the marginals are computed here (pyfanova can not be shipped to
+        # other processes), the plot is rendered by a PlotJob
+        try:
+            data = get_fanova_plot_data(pyfanova, p, p in cat_params, log_scale)
+            jobs.append(PlotJob(plot_fanova_marginal, data, p, out_file))
+            plots.append(out_name)
+            continue
+        except (AttributeError, KeyError, TypeError, ValueError):
+            logging.debug("rendering the fANOVA plot of {} with the pyfanova visualizer".format(p))
+        
+        # fallback: the visualizer of pyfanova in this process
+        matplotlib, plt = import_pyplot()
+        if vis is None:
+            from pyfanova.visualizer import Visualizer
+            vis = Visualizer(pyfanova)
+        
+        fig = plt.figure()
+        
         if p in cat_params:
             logging.info("creating plot for categorical parameter {}".format(p))
             f = vis.plot_categorical_marginal(p)
         elif p in int_params:
             logging.info("creating plot for integer parameter {}".format(p))
             f = vis.plot_marginal(p, is_int=True, log_scale=log_scale)
-        elif p in cont_params:
+        else:
             logging.info("creating plot for continuous parameter {}".format(p))
             f = vis.plot_marginal(p, log_scale=log_scale)
-        else:
-            logging.error("something went wrong with {}".format(p))
-        
-        out_name = "%s_fanova_over_%s.png" %(p, improvement_over)
-        out_file = os.path.join(out_dir, out_name)
         
         f.savefig(out_file, dpi=100, facecolor='w', edgecolor='w',
                 orientation='portrait', papertype=None, format=None,
@@ -519,7 +600,65 @@ def get_fanova(pyfanova, cs, out_dir, improvement_over="DEFAULT", num_params=10)
         f.close()
         plots.append(out_name)
     
-    return most_important, plots
+    return most_important, plots, jobs
+
+def get_fanova_plot_data(pyfanova, param, categorical, log_scale, resolution=100):
+    '''
+        computes the marginal performance of <param> like the visualizer of
+        pyfanova does and returns it as dictionary for plot_fanova_marginal
+    '''
+    import numpy as np
+    
+    dim = pyfanova.param_name2dmin[param]
+    config_space = pyfanova.get_config_space()
+    if categorical:
+        size = config_space.get_categorical_size(param)
+        marginals = [pyfanova.get_categorical_marginal_for_value(dim, i) for i in range(size)]
+        return {"categorical": True,
+                "labels": list(config_space.get_categorical_values(param)),
+                "mean": [float(m) for m, _ in marginals]}
+    
+    grid = np.linspace(0, 1, resolution)
+    display_grid = [float(pyfanova.unormalize_value(param, value)) for value in grid]
+    marginals = [pyfanova.get_marginal_for_value(dim, value) for value in grid]
+    # pyfanova's check for parameters on a log scale
+    semilog = log_scale or (np.diff(display_grid).std() > 0.000001 and
+                            param in config_space.get_continuous_parameters())
+    return {"categorical": False,
+            "grid": display_grid,
+            "mean": [float(m) for m, _ in marginals],
+            "std": [float(s) for _, s in marginals],
+            "semilog": bool(semilog)}
+
+def plot_fanova_marginal(data, param, out_file):
+    '''
+        plots a marginal returned by get_fanova_plot_data (as the visualizer of
+        pyfanova) and returns the name of the image
+    '''
+    import numpy as np
+    matplotlib, plt = import_pyplot()
+    
+    plt.figure()
+    if data["categorical"]:
+        indices = np.arange(len(data["mean"]))
+        width = 0.5
+        plt.bar(indices, data["mean"], width, color='red')
+        plt.xticks(indices + width / 2.0, data["labels"])
+    else:
+        mean, std = np.asarray(data["mean"]), np.asarray(data["std"])
+        if data["semilog"]:
+            plt.semilogx(data["grid"], mean, 'b')
+        else:
+            plt.plot(data["grid"], mean, 'b')
+        plt.fill_between(data["grid"], mean + std, mean - std, facecolor='red', alpha=0.6)
+        plt.xlabel(param)
+    plt.ylabel("Performance")
+    
+    plt.savefig(out_file, dpi=100, facecolor='w', edgecolor='w',
+                orientation='portrait', papertype=None, format=None,
+                transparent=False, pad_inches=0.02, bbox_inches='tight')
+    plt.close()
+    return os.path.basename(out_file)
 
 def get_fanova_marginals(pyfanova, max_num=10):
     '''
@@ -557,12 +696,94 @@ def get_meta_data(inputdir):
     solver_name = None
     with open(meta_data_file) as fp:
         for line in fp:
-            line = line.replace("\n","").split("=")
-            meta_info.append((line[0].strip(" "),line[1].strip(" ")))
-            if "binary" in line[0].strip(" "):
-                solver_name = os.path.split(line[1].strip(" "))[1]
+            # lines are written as "<name> = <value>"; values may contain "="
+            name, sep, value = line.rstrip("\n").partition(" = ")
+            if not sep:
+                name, _, value = line.rstrip("\n").partition("=")
+            meta_info.append((name.strip(" "), value if sep else value.strip(" ")))
+            if "binary" in name:
+                solver_name = os.path.split(value.strip(" "))[1]
             
     return meta_info, solver_name
 
+def get_instance_meta_data(inputdir, read_meta, num_train_instances, num_test_instances):
+    '''
+        returns a list of tuples with the median CNF sizes of the training and
+        test instances read from the instance manifest written by SpySMAC_run
+    '''
+    manifest_file = dict(read_meta).get("instance_manifest", "None")
+    if manifest_file == "None":
+        manifest_file = os.path.join(inputdir, "instances.manifest")
+    instances_file = os.path.join(inputdir, "shuffled_instances.txt")
+    if not os.path.isfile(manifest_file) or not os.path.isfile(instances_file):
+        logging.warn("Have not found the instance manifest: %s" %(manifest_file))
+        return []
+
+    import numpy as np
+    manifest = InstanceManifest(manifest_file)
+    with open(instances_file) as fp:
+        instances = [line.rstrip("\n") for line in fp]
+
+    splits = [("Train", instances[:num_train_instances]),
+              ("Test", instances[num_train_instances:num_train_instances+num_test_instances])]
+    meta_info = []
+    for split, names in splits:
+        for field, title in [("num_vars", "Variables"), ("num_clauses", "Clauses")]:
+            values = [manifest.get(name, field) for name in names]
+            values = [v for v in values if v is not None]
+            if values:
+                meta_info.append(("Median #%s (%s)" %(title, split), "%d" %(np.median(values))))
+    return meta_info
+
+def get_journal_meta_data(inputdir):
+    '''
+        returns a list of tuples with the number of runs and the median
+        overhead of the wrapper read from the run journal written by SpySMAC_run
+    '''
+    journal_file = os.path.join(inputdir, "run_journal.jsonl")
+    if not os.path.isfile(journal_file):
+        return []
+
+    import numpy as np
+    journal = load_journal(journal_file)
+    executed = journal[~journal.cached]
+    meta_info = [("#Runs (cached)", "%d (%d)" %(len(journal), len(journal) - len(executed)))]
+    if len(executed):
+        overhead = executed.total_time - executed.wall_time
+        meta_info.append(("Median wrapper overhead per run", "%.1f ms" %(1000 * np.median(overhead))))
+    return meta_info
+
+def get_portfolio(obj, run_ids, train_performances, test_performances, read_meta, size, factor, out_dir):
+    '''
+        selects greedily up to <size> incumbents such that running them in parallel
+        has the best PAR score on the training instances, writes the selection
+        (portfolio.txt) and a launcher (portfolio.sh) to <out_dir> and returns a
+        list of tuples with the scores of the portfolio
+    '''
+    from SpySMAC.utils.portfolio import greedy_portfolio, portfolio_runtimes, \
+        write_launcher, member_command, status_patterns
+    from SpySMAC.utils.runtime_stats import score
+
+    selected, scores = greedy_portfolio(train_performances, obj.cutoff_time, size, factor)
+    test_score = score(portfolio_runtimes(test_performances, selected), obj.cutoff_time, factor)
+
+    configs = [obj.parameters[j] for j in selected]
+    with open(os.path.join(out_dir, "portfolio.txt"), "w") as fp:
+        fp.write("# member\trun\ttraining score after adding the member\tconfiguration\n")
+        for n, (j, train_score, config) in enumerate(zip(selected, scores, configs)):
+            fp.write("%d\t%s\t%f\t%s\n" %(n, run_ids[j], train_score,
+                     " ".join("-%s '%s'" %(name, config[name]) for name in sorted(config))))
+    try:
+        write_launcher(os.path.join(out_dir, "portfolio.sh"),
+                       [member_command(read_meta, config) for config in configs],
+                       status_patterns(read_meta))
+    except:
+        traceback.print_exc()
+        logging.warn("Writing the launcher of the parallel portfolio failed")
+
+    return [("Parallel portfolio (#configurations)", "%d" %(len(selected))),
+            ("Parallel portfolio PAR%d (Train)" %(factor + 1), "%.2f" %(scores[-1])),
+            ("Parallel portfolio PAR%d (Test)" %(factor + 1), "%.2f" %(test_score))]
+
 if __name__ == "__main__":
     sys.exit(analyze_simulations(sys.argv))
@@ -15,9 +15,12 @@ pySMAC4SAT -- configuration for SAT
 import os
 import sys
 import signal
-import resource
-import imp
+import time
 import errno
+import re
+import shutil
+import tempfile
+import threading
 
 import logging
 import random
@@ -31,10 +34,25 @@ sys.path =[ os.path.join(spysmac_path, "pysmac"),
             os.path.join(spysmac_path, "pynisher"),
             os.path.join(spysmac_path, "cpuinfo")] + sys.path
 
-import pysmac
-import pysmac.utils
-
-from cpuinfo.cpuinfo import get_cpu_info
+from SpySMAC.utils.host_info import get_host_info
+
+from SpySMAC.utils.cmd_builder import get_cmd_builder
+from SpySMAC.utils.call_string import CallStringTemplate
+from SpySMAC.utils.target_run import read_output, wait_for_process, resource_limiter, \
+    kill_process_group, group_alive, LeftoverWatch
+from SpySMAC.utils.output_scanner import OutputScanner, parse_status_patterns
+from SpySMAC.utils.result_cache import RunResultCache, get_result_cache, config_hash, \
+    command_fingerprint
+from SpySMAC.utils.instance_staging import InstanceStager, get_instance_stager
+from SpySMAC.utils.instance_manifest import InstanceManifest
+from SpySMAC.utils.validation import Validator, ValidationResults, read_configuration, \
+    format_configuration, classify_instances
+from SpySMAC.utils.warm_start import collect_incumbents
+from SpySMAC.utils.instance_split import read_default_runtimes, stratified_split, \
+    read_split, write_split, append_default_runtime
+from SpySMAC.utils.core_pinning import CoreAllocator, get_core_allocator, pin_command, parse_cpu_list
+from SpySMAC.utils.telemetry import TreeSampler
+from SpySMAC.utils.run_journal import get_run_journal, load_journal
 
 __version__ = 0.2
 __date__ = '2015-03-18'
@@ -44,46 +62,131 @@ __updated__ = '2015-05-20'
 random.seed(12345)
 
 instance_names = []
-cmd = ''
-parameter_string_template = ''
+call_template = None
+cmd_builder_script = None
+cmd_builder_cache = 0
+status_patterns = None
+output_tail_kb = 64
+drop_model_lines = False
+cutoff = None
+memory_limit = None
+result_cache_file = None
+staging_dir = None
+staging_size_mb = 10240
+core_lock_dir = None
+cores_per_run = 1
+skip_smt = False
+reserved_cores = ()
+telemetry_interval = None
+kill_grace = 2.0
+journal_file = None
+default_runtimes_file = None
 
 
 def sat_function(instance=None, seed=None,  **kwargs):
-    # construct the command for the run
     global instance_names
-    global cmd
-    global parameter_string_template
-    global cmd_builder_script
 
+    return run_target(str(instance_names[instance%len(instance_names)]), seed, kwargs)
+
+
+def run_target(instance_name, seed, config, run_cutoff=None, enforce_limits=False):
+    '''
+        runs the solver with a configuration on an instance
+        Args:
+            instance_name: path to the instance
+            seed: seed passed to the solver
+            config: mapping param_name -> value
+            run_cutoff: runtime cutoff of this run (default: --cutoff)
+            enforce_limits: limit CPU time, memory and wall clock time of the
+                solver (used if the run is not started by SMAC)
+        Returns:
+            dictionary with 'value', 'runtime' and 'status' 
+    '''
+    # construct the command for the run
+    global call_template
+    global cmd_builder_script
+    global cmd_builder_cache
+    global status_patterns
+    global output_tail_kb
+    global drop_model_lines
+    global cutoff
+    global memory_limit
+    global result_cache_file
+    global staging_dir
+    global staging_size_mb
+    global core_lock_dir
+    global cores_per_run
+    global skip_smt
+    global reserved_cores
+    global telemetry_interval
+    global kill_grace
+    global journal_file
+    global default_runtimes_file
+
+    entry_time = time.time()
+    if run_cutoff is None:
+        run_cutoff = cutoff
+    tempdir = None
+
+    # reuse a stored result of the same run if it is valid for this cutoff
+    result_cache = None
+    if result_cache_file is not None:
+        result_cache = get_result_cache(result_cache_file)
+        cached = result_cache.lookup(config, instance_name, seed, run_cutoff)
+        if cached is not None:
+            logging.debug("Reusing stored result %s for %s (seed %s)"
+                          % (cached, instance_name, seed))
+            if journal_file is not None:
+                get_run_journal(journal_file).add({
+                    'config': config_hash(config), 'instance': instance_name,
+                    'seed': seed, 'status': cached[0], 'cached': True,
+                    'cpu_time': cached[1], 'wall_time': 0., 'cutoff': run_cutoff,
+                    'builder_time': 0., 'spawn_time': 0., 'wait_time': 0.,
+                    'parse_time': 0., 'total_time': time.time() - entry_time})
+            return {'value':1, 'runtime':cached[1], 'status':cached[0].encode()}
+
+    # the solver gets the decompressed copy, all records keep the original name
+    instance_path = instance_name
+    stager = None
+    if staging_dir is not None:
+        stager = get_instance_stager(staging_dir, staging_size_mb)
+        instance_path = stager.stage(instance_name)
+
+    builder_start = time.time()
     if cmd_builder_script is None:
-        cmd = cmd.replace("<instance>", str(instance_names[instance%len(instance_names)]))
-        cmd = cmd.replace("<seed>", str(seed))
-        cmd = cmd.replace('<params>', ' '.join(
-            [parameter_string_template % (k, kwargs[k]) for k in kwargs]))
+        if call_template.uses_tempdir:
+            tempdir = tempfile.mkdtemp(prefix="spysmac_")
+        cmd = call_template.argv(instance_path, seed, config, tempdir)
+        builder_time = time.time() - builder_start
             
-        logging.info("Issuing algorithm run with command\n{}".format(cmd))
+        logging.info("Issuing algorithm run with command\n{}".format(" ".join(cmd)))
     
     else: 
-        loaded_script = imp.load_source("cmd_builder", cmd_builder_script)
-        runargs = {   "instance": str(instance_names[instance%len(instance_names)]),
+        # the builder is loaded once in run_simulations; forked workers reuse it
+        builder = get_cmd_builder(cmd_builder_script, cmd_builder_cache)
+        runargs = {   "instance": instance_path,
                       "seed" : seed,
-                      "binary" : cmd.split(" ")[0]
+                      "binary" : call_template.binary
                    }
-        cmd = loaded_script.get_command_line_cmd(runargs, kwargs)
-        
-    cmd = cmd.split()
+        cmd = builder.build(runargs, config)
+        if not isinstance(cmd, list):
+            cmd = cmd.split()
+        builder_time = time.time() - builder_start
 
     # set up the signal handle to catch all the signals for proper
     # cleaning up, i.e. killing the SAT solver.
     p = None
 
     def signal_handler(signum, frame):
-        try:
-            p.terminate()
-        except:
+        # the solver runs in its own session; this also stops its children
+        if p is None or not group_alive(p.pid):
             logging.debug("Killing the SAT solver failed. "
                           "It probably finished already.")
+        else:
+            kill_process_group(p.pid, kill_grace)
         logging.debug('Exiting because signal %d was received' % signum)
+        if tempdir is not None:
+            shutil.rmtree(tempdir, ignore_errors=True)
         exit(1)
 
     signal.signal(signal.SIGALRM, signal_handler)
@@ -93,38 +196,426 @@ def sat_function(instance=None, seed=None,  **kwargs):
     # actually run the solver in a separate process and grab its output
     logging.debug("CALL: " +" ".join(cmd))
 
-    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    stdout, stderr = p.communicate()
-    logging.debug("Solver output:\n%s\n"%stdout)
+    # a new session (and process group) for the solver and all its children
+    preexec_fns = [os.setsid]
+    allocator = None
+    cpus = None
+    if core_lock_dir is not None:
+        # wait for CPUs that no other concurrent run uses
+        allocator = get_core_allocator(core_lock_dir, cores_per_run,
+                                       skip_smt, reserved_cores)
+        cpus = allocator.acquire()
+        cmd, pin_fn = pin_command(cmd, cpus)
+        if pin_fn is not None:
+            preexec_fns.append(pin_fn)
+        logging.info("Run on %s (seed %s) pinned to CPUs %s"
+                     % (instance_name, seed, ",".join(str(cpu) for cpu in cpus)))
+    if enforce_limits:
+        preexec_fns.append(resource_limiter(run_cutoff, memory_limit))
+
+    def preexec_fn():
+        for fn in preexec_fns:
+            fn()
+
+    try:
+        start_time = time.time()
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             preexec_fn=preexec_fn)
+        spawn_time = time.time() - start_time
+        # the solver runs until its output is closed; waiting for it is
+        # everything between spawning and reaping except the parsing
+        wait_start = time.time()
+        watchdog = None
+        if enforce_limits:
+            # solvers that wait (e.g., for I/O) are not stopped by the CPU time limit
+            watchdog = threading.Timer(2 * run_cutoff + 10, kill_process_group,
+                                       args=(p.pid, kill_grace))
+            watchdog.daemon = True
+            watchdog.start()
+        sampler = None
+        if telemetry_interval is not None:
+            sampler = TreeSampler(p.pid, telemetry_interval).start()
+        scanner = OutputScanner(status_patterns, tail_bytes=output_tail_kb*1024,
+                                keep_model=not drop_model_lines)
+        stderr_scanner = OutputScanner([], tail_bytes=output_tail_kb*1024)
+        leftover_watch = LeftoverWatch(p.pid, kill_grace).start()
+        parse_time = read_output(p, scanner, stderr_scanner)
+        leftover_watch.stop()
+        if leftover_watch.killed:
+            logging.warn("Killed leftover processes of the solver that kept "
+                         "its output open (process group %d)" % (p.pid))
+        # account for exactly this run, not for all children of the wrapper
+        usage = wait_for_process(p, start_time)
+        wait_time = time.time() - wait_start - parse_time
+        if watchdog is not None:
+            watchdog.cancel()
+        if sampler is not None:
+            telemetry = sampler.stop()
+        # children that outlived the solver would steal CPU time from later runs;
+        # a group killed by the LeftoverWatch only has zombies left until init reaps them
+        if not leftover_watch.killed and group_alive(p.pid):
+            logging.warn("Killing leftover processes of the solver (process group %d)" % (p.pid))
+            kill_process_group(p.pid, kill_grace)
+    except BaseException:
+        # e.g., KeyboardInterrupt: the solver runs in its own session and
+        # does not get the SIGINT of the terminal
+        if p is not None and p.returncode is None:
+            kill_process_group(p.pid, kill_grace)
+        if tempdir is not None:
+            shutil.rmtree(tempdir, ignore_errors=True)
+        raise
+    finally:
+        if allocator is not None:
+            allocator.release()
+        if stager is not None:
+            stager.release(instance_path)
+    logging.debug("Solver output (last %d of %d bytes):\n%s\n"
+                  % (len(scanner.tail()), scanner.num_bytes, scanner.tail()))
+    if stderr_scanner.num_bytes:
+        logging.debug("Solver stderr (last %d of %d bytes):\n%s\n"
+                      % (len(stderr_scanner.tail()), stderr_scanner.num_bytes,
+                         stderr_scanner.tail()))
+    logging.debug("Resource usage: %s" % (usage))
+    if tempdir is not None:
+        shutil.rmtree(tempdir, ignore_errors=True)
 
     # record cpu time with ('arbitrary') lower cutoff
-    cpu_time =  resource.getrusage(resource.RUSAGE_CHILDREN).ru_utime +\
-                 resource.getrusage(resource.RUSAGE_CHILDREN).ru_stime
-    rt = max(cpu_time, 0.05)
+    rt = max(usage.cpu_time, 0.05)
+
+    status = scanner.status
+    if enforce_limits and rt >= run_cutoff:
+        status = None
 
     return_dict = {'value':1, 'runtime':rt}
-    if b'UNSATISFIABLE' in stdout:  return_dict['status'] = b'UNSAT'
-    elif b'SATISFIABLE' in stdout:  return_dict['status'] = b'SAT'
+    if status is not None:  return_dict['status'] = status.encode()
     else: return_dict['status'] = b'TIMEOUT'
+
+    # crashes are reported as TIMEOUT as well, but must not be stored as such
+    if result_cache is not None and (status is not None or rt >= run_cutoff):
+        result_cache.store(config, instance_name, seed,
+                           status or "TIMEOUT", rt, run_cutoff)
+
+    if journal_file is not None:
+        record = {'config': config_hash(config), 'instance': instance_name,
+                  'seed': seed, 'status': status or "TIMEOUT", 'cached': False,
+                  'cpu_time': rt, 'wall_time': usage.wall_time, 'cutoff': run_cutoff,
+                  'builder_time': builder_time, 'spawn_time': spawn_time,
+                  'wait_time': wait_time, 'parse_time': parse_time,
+                  'total_time': time.time() - entry_time}
+        if sampler is not None:
+            # rusage covers all reaped descendants, the samples also orphans
+            telemetry['peak_rss_kb'] = max(telemetry['peak_rss_kb'], usage.max_rss_kb)
+            telemetry['voluntary_ctx_switches'] = max(telemetry['voluntary_ctx_switches'],
+                                                      usage.voluntary_ctx_switches)
+            telemetry['involuntary_ctx_switches'] = max(telemetry['involuntary_ctx_switches'],
+                                                        usage.involuntary_ctx_switches)
+            record.update(telemetry)
+        if allocator is not None:
+            record['cpus'] = cpus
+        get_run_journal(journal_file).add(record)
+    if default_runtimes_file is not None:
+        append_default_runtime(default_runtimes_file, instance_name,
+                               status or "TIMEOUT", rt)
     return(return_dict)
 
-def find_instances(instance_ref):
+
+def log_builder_latency(journal_start):
+    '''
+        logs the load and build latencies of the command line builder; the
+        builds of all (forked) processes are read from the records the run
+        journal got since <journal_start> (byte offset)
+    '''
+    if cmd_builder_script is None:
+        return
+    builder = get_cmd_builder(cmd_builder_script, cmd_builder_cache)
+    build_times = None
+    if journal_file is not None:
+        get_run_journal(journal_file).flush()
+        if os.path.isfile(journal_file):
+            journal = load_journal(journal_file, journal_start)
+            build_times = journal.builder_time[~journal.cached]
+    logging.info(builder.summary(build_times))
+
+
+def validation_run(job):
+    '''
+        runs one (config_id, config, instance, seed, cutoff) job of the
+        validation and returns (job, status, runtime)
+    '''
+    config_id, config, instance, seed, run_cutoff = job
+    result = run_target(instance, seed, config, run_cutoff=run_cutoff,
+                        enforce_limits=True)
+    status = result['status']
+    if not isinstance(status, str):
+        status = status.decode()
+    return job, status, result['runtime']
+
+
+def validate_configurations(options, validation_instances, manifest):
+    '''
+        validates the configurations given by --validate on the validation
+        instances with a local process pool; the results are streamed to
+        <outputdir>/validation_results.txt and an interrupted validation is
+        resumed from there
+    '''
+    configs = []
+    for conf in options['validate']:
+        if conf == "default":
+            # the configuration space (and numpy) is only needed here
+            from SpySMAC.utils.config_space import ConfigSpace
+            config = ConfigSpace(options['pcs']).get_default_config_dict()
+            config_id = "default"
+        else:
+            try:
+                config = read_configuration(conf)
+            except ValueError as e:
+                logging.error("Could not read the configuration: %s" % (e))
+                sys.exit(3)
+            if os.path.isfile(conf):
+                config_id = os.path.splitext(os.path.basename(conf))[0]
+            else:
+                config_id = "conf_%d" % (len(configs) + 1)
+        if config_id in [c[0] for c in configs]:
+            config_id = "%s_%d" % (config_id, len(configs))
+        configs.append((config_id, config))
+
+    results = ValidationResults(os.path.join(options['outputdir'], 'validation_results.txt'))
+    sizes = dict((inst, manifest.get(inst, "size")) for inst in validation_instances)
+    validator = Validator(validation_run, results, num_procs=options['num_procs'],
+                          instance_sizes=sizes)
+    try:
+        if options['adaptive_capping'] and len(configs) > 1:
+            best_id, scores = validator.validate_capped(configs, validation_instances,
+                                                        options['seed'], options['cutoff'])
+            for config_id, _ in configs:
+                if scores[config_id] is None:
+                    logging.info("%s: dropped (worse than %s)" % (config_id, best_id))
+                else:
+                    logging.info("%s: PAR10 %.2f" % (config_id, scores[config_id]))
+            logging.info("Best configuration: %s" % (best_id))
+            return scores
+        runtimes = validator.validate(configs, validation_instances,
+                                      options['seed'], options['cutoff'])
+    finally:
+        validator.close()
+        results.close()
+
+    from SpySMAC.utils.runtime_stats import score
+    for config_id, _ in configs:
+        rts = runtimes[config_id]
+        logging.info("%s: PAR10 %.2f, PAR1 %.2f, %d/%d timeouts" % (
+            config_id, score(rts, options['cutoff'], 9),
+            score(rts, options['cutoff'], 0),
+            sum(1 for rt in rts if rt >= options['cutoff']), len(rts)))
+    return runtimes
+
+def sample_configurations(pcs_file, num_random, seed):
+    '''
+        returns the default and <num_random> random configurations as list of
+        (config_id, config) tuples; the random configurations only depend on
+        <seed>, such that an interrupted pass is resumed with the same ones
+    '''
+    # the configuration space (and numpy) is only needed here
+    from SpySMAC.utils.config_space import ConfigSpace
+    cs = ConfigSpace(pcs_file)
+    configs = [("default", cs.get_default_config_dict())]
+    # ConfigSpace samples with the global random generator
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        for i in range(num_random):
+            configs.append(("random_%d" % (i + 1),
+                            cs.convert_param_vector(cs.get_random_config_vector())))
+    finally:
+        random.setstate(state)
+    return configs
+
+def prefilter_instances(options, instances, num_train_instances, manifest):
+    '''
+        runs the default and --prefilter-random random configurations on all
+        instances with the short --prefilter-cutoff and the instances no
+        configuration solved again with --cutoff; writes the training and
+        validation instances without the trivial and the hopeless instances to
+        <outputdir>/prefiltered_{training,validation}_instances.txt; the runs
+        of the default are written to <outputdir>/default_runtimes.txt
+    '''
+    configs = sample_configurations(options['pcs'], options['prefilter_random'], options['seed'])
+
+    run_cutoff = min(options['prefilter_cutoff'] or options['cutoff'] / 10., options['cutoff'])
+    results = ValidationResults(os.path.join(options['outputdir'], 'prefilter_results.txt'))
+    sizes = dict((inst, manifest.get(inst, "size")) for inst in instances)
+    validator = Validator(validation_run, results, num_procs=options['num_procs'],
+                          instance_sizes=sizes)
+    try:
+        runtimes = validator.validate(configs, instances, options['seed'], run_cutoff)
+        # only the instances no configuration solved can be hopeless
+        unsolved = [i for i in range(len(instances))
+                    if all(rts[i] >= run_cutoff for rts in runtimes.values())]
+        if unsolved and run_cutoff < options['cutoff']:
+            logging.info("Running %d instances that no configuration solved within "
+                         "%.2f sec again with the cutoff %.2f sec"
+                         % (len(unsolved), run_cutoff, options['cutoff']))
+            rerun = validator.validate(configs, [instances[i] for i in unsolved],
+                                       options['seed'], options['cutoff'])
+            for config_id, rts in rerun.items():
+                for i, rt in zip(unsolved, rts):
+                    runtimes[config_id][i] = rt
+    finally:
+        validator.close()
+        results.close()
+
+    with open(os.path.join(options['outputdir'], 'default_runtimes.txt'), 'w') as fh:
+        for inst, rt in zip(instances, runtimes["default"]):
+            fh.write("%s\t%s\t%f\n" % (inst, results.get(configs[0][1], inst, options['seed'])[0], rt))
+
+    classes = classify_instances(instances, runtimes, options['cutoff'],
+                                 trivial_runtime=options['trivial_runtime'])
+    splits = [("training", instances[:num_train_instances]),
+              ("validation", instances[num_train_instances:])]
+    for split, names in splits:
+        kept = [inst for inst in names if classes[inst] == "kept"]
+        fn = os.path.join(options['outputdir'], 'prefiltered_%s_instances.txt' % (split))
+        with open(fn, 'w') as fh:
+            fh.write("".join("%s\n" % (inst) for inst in kept))
+        logging.info("%s instances: %d kept, %d trivial, %d hopeless" % (
+            split, len(kept),
+            sum(1 for inst in names if classes[inst] == "trivial"),
+            sum(1 for inst in names if classes[inst] == "hopeless")))
+        if names and not kept:
+            logging.warn("All %s instances are trivial or hopeless; %s is empty"
+                         % (split, fn))
+    return classes
+
+def warm_start_incumbent(options, train_instances, manifest):
+    '''
+        re-validates the final incumbents of the SMAC runs in the --warm-start
+        directories on the training instances (with adaptive capping and the
+        result cache) and returns the best one or None
+    '''
+    # the configuration space (and numpy) is only needed here
+    from SpySMAC.utils.config_space import ConfigSpace
+    incumbents = collect_incumbents(options['warm_start'], ConfigSpace(options['pcs']))
+    if not incumbents:
+        logging.warn("No incumbents found for the warm start")
+        return None
+    logging.info("Re-validating %d incumbents of earlier runs" % (len(incumbents)))
+
+    results = ValidationResults(os.path.join(options['outputdir'],
+                                             'warm_start_results_%d.txt' % (options['seed'])))
+    sizes = dict((inst, manifest.get(inst, "size")) for inst in train_instances)
+    validator = Validator(validation_run, results, num_procs=options['num_procs'],
+                          instance_sizes=sizes)
+    try:
+        best_id, scores = validator.validate_capped(incumbents, train_instances,
+                                                    options['seed'], options['cutoff'])
+    finally:
+        validator.close()
+        results.close()
+
+    for config_id, _ in incumbents:
+        if scores[config_id] is not None:
+            logging.info("%s: PAR10 %.2f" % (config_id, scores[config_id]))
+    logging.info("Warm start from %s" % (best_id))
+    return dict(incumbents)[best_id]
+
+def successive_halving_incumbent(options, train_instances, manifest):
+    '''
+        runs successive halving with the default, the --warm-start incumbents
+        and --successive-halving random configurations on the training
+        instances, writes the survivors to <outputdir>/sh_survivors/ (usable
+        with --validate) and returns the best one
+    '''
+    configs = sample_configurations(options['pcs'], options['successive_halving'], options['seed'])
+    if options['warm_start']:
+        from SpySMAC.utils.config_space import ConfigSpace
+        configs.extend(collect_incumbents(options['warm_start'], ConfigSpace(options['pcs'])))
+
+    min_cutoff = options['sh_min_cutoff'] or options['cutoff'] / float(options['sh_eta'] ** 2)
+    results = ValidationResults(os.path.join(options['outputdir'],
+                                             'sh_results_%d.txt' % (options['seed'])))
+    sizes = dict((inst, manifest.get(inst, "size")) for inst in train_instances)
+    validator = Validator(validation_run, results, num_procs=options['num_procs'],
+                          instance_sizes=sizes)
+    try:
+        survivors = validator.successive_halving(configs, train_instances, options['seed'],
+                                                 options['cutoff'], options['sh_min_instances'],
+                                                 min_cutoff, eta=options['sh_eta'],
+                                                 num_survivors=options['sh_survivors'])
+    finally:
+        validator.close()
+        results.close()
+
+    survivor_dir = os.path.join(options['outputdir'], 'sh_survivors')
+    if not os.path.isdir(survivor_dir):
+        os.makedirs(survivor_dir)
+    for config_id, config, score in survivors:
+        with open(os.path.join(survivor_dir, '%s.txt' % (config_id)), 'w') as fh:
+            fh.write(format_configuration(config) + "\n")
+        logging.info("Survivor %s: PAR10 %.2f in the last round" % (config_id, score))
+    return survivors[0][1]
+
+def stratified_instance_split(options, instances, manifest):
+    '''
+        returns a (training, test) split of <instances> stratified by the
+        runtime of the default configuration (--split-runtimes) or by the
+        number of clauses; the split is stored in <outputdir>/instance_split.txt
+        and reused by all runs with the same output directory
+    '''
+    split_file = os.path.join(options['outputdir'], 'instance_split.txt')
+    if os.path.isfile(split_file):
+        train, test = read_split(split_file)
+        if sorted(train + test) == sorted(instances):
+            logging.info("Reusing the training/test split of %s" % (split_file))
+            return train, test
+        logging.warn("The instances differ from the split in %s; creating a new split"
+                     % (split_file))
+
+    runtimes_file = options['split_runtimes']
+    if runtimes_file is None:
+        runtimes_file = os.path.join(options['outputdir'], 'default_runtimes.txt')
+    if os.path.isfile(runtimes_file):
+        hardness = read_default_runtimes(runtimes_file)
+        logging.info("Stratifying by the default runtimes in %s" % (runtimes_file))
+    else:
+        hardness = dict((inst, manifest.get(inst, "num_clauses")) for inst in instances)
+        hardness = dict((inst, h) for inst, h in hardness.items() if h is not None)
+        logging.info("Stratifying by the number of clauses")
+    missing = sum(1 for inst in instances if inst not in hardness)
+    if missing:
+        logging.warn("No hardness known for %d instances" % (missing))
+
+    train, test = stratified_split(instances, hardness, options['validation_fraction'], random)
+    write_split(split_file, train, test)
+    return train, test
+
+def find_instances(instance_ref, manifest=None):
+    '''
+        returns the instances listed in the file <instance_ref> or found in
+        the directory <instance_ref>; if an InstanceManifest is given, the
+        files are checked (and indexed) in parallel
+    '''
     logging.info("Read Files from {}".format(instance_ref))
     instances = []
     if os.path.isfile(instance_ref):
         with open(instance_ref) as fp:
-            for inst in fp:
-                inst = inst.rstrip("\n")
-                if os.path.isfile(inst):
-                    instances.append(inst)
-                else:
-                    logging.warn("Not found: %s" % inst)
+            listed = [inst.rstrip("\n") for inst in fp]
+        if manifest is not None:
+            found = set(manifest.update(listed))
+        else:
+            found = set(inst for inst in listed if os.path.isfile(inst))
+        for inst in listed:
+            if inst in found:
+                instances.append(inst)
+            else:
+                logging.warn("Not found: %s" % inst)
 
     elif os.path.isdir(instance_ref):
         for root, dirs, files in os.walk(instance_ref):
             for file_ in files:
                 if file_.endswith(".cnf") or file_.endswith(".cnf.gz"):
                     instances.append(os.path.join(root, file_))
+        if manifest is not None:
+            instances = manifest.update(instances)
 
     if not instances:
         logging.error("No instances found!")
@@ -201,6 +692,28 @@ USAGE
                             help="problem  instances that are used for "
                             "tuning, the rest will be used for validation.")
 
+    opt_params.add_argument("--split", default="random",
+                            choices=["random", "stratified"],
+                            help="training/validation split with "
+                            "--validation-fraction: random or stratified by "
+                            "hardness, i.e. by the default runtimes "
+                            "(--split-runtimes) or by the number of clauses")
+
+    opt_params.add_argument("--split-runtimes", default=None,
+                            help="default runtimes for --split stratified as "
+                            "written by a seed-0 run or by --prefilter "
+                            "(default: <outputdir>/default_runtimes.txt, if it exists)")
+
+    opt_params.add_argument("-M", "--instance-manifest", default=None,
+                            help="index file with size, mtime, content hash "
+                            "and CNF header of all instances; only new or "
+                            "modified instances are indexed again "
+                            "(default: <outputdir>/instances.manifest)")
+
+    opt_params.add_argument("--scan-threads", default=16, type=int,
+                            help="number of threads used to check and index "
+                            "the instance files")
+
     opt_params.add_argument("-n", "--num-procs", default=1, type=int,
                             help="number of available processors/cores to run "
                             "SMAC in parallel")
@@ -224,6 +737,166 @@ USAGE
                             "get_command_line_cmd(runargs, config) "
                             "to implement your own cmd call builder")
 
+    opt_params.add_argument("--cmd_builder_cache", default=0, type=int,
+                            help="number of configurations whose command "
+                            "line the cmd_builder_script builds only once per "
+                            "process (e.g., per validation worker); instance "
+                            "and seed are filled in per run (0 disables the cache)")
+
+    opt_params.add_argument("--status-regex", default=[], action="append",
+                            help="regular expression for the status line of "
+                            "your solver, e.g. 'SAT=^s SATISFIABLE'; can be "
+                            "given several times (default: [s ]SATISFIABLE "
+                            "and [s ]UNSATISFIABLE at the line start)")
+
+    opt_params.add_argument("--output-tail", default=64, type=int,
+                            help="size of the solver output kept for "
+                            "debugging (kb)")
+
+    opt_params.add_argument("--drop-model-lines", action="store_true",
+                            default=False,
+                            help="do not keep model lines ('v ...') of the "
+                            "solver output")
+
+    opt_params.add_argument("--result-cache", action="store_true",
+                            default=False,
+                            help="store all run results in the output "
+                            "directory (run_results.sqlite) and reuse them "
+                            "for identical runs (configuration, instance, "
+                            "seed) with a compatible cutoff")
+
+    opt_params.add_argument("--stage-instances", default=None,
+                            help="directory (preferably on a local disk or "
+                            "tmpfs) into which gzipped instances are "
+                            "decompressed once and reused by all runs")
+
+    opt_params.add_argument("--stage-size", default=10240, type=int,
+                            help="size limit of the directory with the "
+                            "decompressed instances (mb); the least recently "
+                            "used instances are removed first")
+
+    opt_params.add_argument("--validate", default=None, nargs="+",
+                            metavar="CONF",
+                            help="instead of running SMAC, validate the given "
+                            "configurations on the validation instances with "
+                            "--num-procs parallel runs; CONF is 'default', "
+                            "a file with name=value pairs or SMAC-style "
+                            "\"-name 'value'\" pairs, or the configuration "
+                            "itself, e.g. \"name=value name2=value2\" or "
+                            "\" -name 'value'\" (with a leading space, such "
+                            "that it is not taken as an option). Results are written to "
+                            "<outputdir>/validation_results.txt and an "
+                            "interrupted validation is resumed")
+
+    opt_params.add_argument("--pin-cores", default=False, action="store_true",
+                            help="pin every solver run to dedicated CPUs; "
+                            "concurrent runs (also of other SpySMAC processes "
+                            "with the same --core-lock-dir) never share a CPU")
+
+    opt_params.add_argument("--cores-per-run", default=1, type=int,
+                            help="number of physical cores per solver run "
+                            "(with --pin-cores)")
+
+    opt_params.add_argument("--skip-smt", default=False, action="store_true",
+                            help="use only one hardware thread per physical "
+                            "core; the SMT siblings stay idle (with --pin-cores)")
+
+    opt_params.add_argument("--reserve-cores", default="",
+                            help="CPUs that are not used for solver runs, e.g. "
+                            "'0' or '0-1' for SMAC itself (with --pin-cores)")
+
+    opt_params.add_argument("--core-lock-dir", default=None,
+                            help="directory with the CPU lock files (default: "
+                            "spysmac_cores_<uid> in the temporary directory)")
+
+    opt_params.add_argument("--telemetry", default=None, type=float,
+                            metavar="SEC",
+                            help="sample peak RSS, context switches and I/O "
+                            "bytes of the solver process tree every SEC "
+                            "seconds from /proc and add them (and the pinned "
+                            "CPUs) to the records of the run journal")
+
+    opt_params.add_argument("--kill-grace", default=2.0, type=float,
+                            help="seconds between SIGTERM and SIGKILL when "
+                            "the solver (with all its child processes) is "
+                            "stopped")
+
+    opt_params.add_argument("--no-run-journal", default=False,
+                            action="store_true",
+                            help="do not write <outputdir>/run_journal.jsonl "
+                            "with one record (status, CPU and wall time, "
+                            "wrapper overhead and --telemetry) per run")
+
+    opt_params.add_argument("--warm-start", default=None, nargs="+",
+                            metavar="DIR",
+                            help="output directories of earlier SpySMAC runs; "
+                            "their run results are imported into the result "
+                            "cache (--result-cache is implied) and the best of "
+                            "their incumbents on the training instances is "
+                            "SMAC's initial incumbent")
+
+    opt_params.add_argument("--prefilter", default=False, action="store_true",
+                            help="instead of running SMAC, run the default (and "
+                            "--prefilter-random random configurations) on all "
+                            "instances with --num-procs parallel runs and write "
+                            "training and validation instance lists without the "
+                            "trivial and hopeless instances to <outputdir>/"
+                            "prefiltered_{training,validation}_instances.txt "
+                            "(use them with -i and -I); exits with an error "
+                            "if no training instance is left")
+
+    opt_params.add_argument("--prefilter-random", default=0, type=int,
+                            help="number of random configurations in the "
+                            "--prefilter pass")
+
+    opt_params.add_argument("--prefilter-cutoff", default=None, type=float,
+                            help="runtime cutoff of the first --prefilter "
+                            "pass; only the instances no configuration solves "
+                            "within it are run again with --cutoff to find "
+                            "the hopeless ones (default: --cutoff / 10)")
+
+    opt_params.add_argument("--trivial-runtime", default=0.05, type=float,
+                            help="instances the default solves within this "
+                            "time are trivial and removed by --prefilter")
+
+    opt_params.add_argument("--successive-halving", default=0, type=int,
+                            metavar="N",
+                            help="before SMAC, run successive halving with the "
+                            "default, the --warm-start incumbents and N random "
+                            "configurations on growing subsets of the training "
+                            "instances with growing cutoffs; the best survivor "
+                            "is SMAC's initial incumbent and all survivors are "
+                            "written to <outputdir>/sh_survivors/")
+
+    opt_params.add_argument("--sh-eta", default=3, type=int,
+                            help="successive halving keeps the best 1/eta "
+                            "configurations per round and multiplies the number "
+                            "of instances and the cutoff by eta")
+
+    opt_params.add_argument("--sh-min-instances", default=10, type=int,
+                            help="number of instances in the first round of "
+                            "successive halving")
+
+    opt_params.add_argument("--sh-min-cutoff", default=None, type=float,
+                            help="cutoff in the first round of successive "
+                            "halving (default: cutoff / eta^2)")
+
+    opt_params.add_argument("--sh-survivors", default=1, type=int,
+                            help="number of configurations that survive "
+                            "successive halving")
+
+    opt_params.add_argument("--sh-only", default=False, action="store_true",
+                            help="stop after successive halving (e.g., to "
+                            "validate the survivors with --validate)")
+
+    opt_params.add_argument("--adaptive-capping", default=False,
+                            action="store_true",
+                            help="with --validate: validate the first CONF "
+                            "completely and the others in lock-step over the "
+                            "instances; runs are capped at the remaining slack "
+                            "to the best PAR10 score and a configuration is "
+                            "dropped as soon as it cannot beat the best one")
+
     opt_params.add_argument("-v", "--verbosity", default="INFO",
                             choices=["DEBUG", "INFO", "WARNING", "ERROR"],
                             help="verbosity level")
@@ -254,6 +927,11 @@ USAGE
         logging.error("Could not find the binary: %s" %(args.binary))
         sys.exit(3)
 
+    if args.sh_eta < 2:
+        # with eta 1, successive halving never drops a configuration
+        logging.error("--sh-eta must be at least 2, not %d" % (args.sh_eta))
+        sys.exit(3)
+
     logging.debug(str(vars(args)))
 
     return(vars(args))
@@ -262,27 +940,113 @@ USAGE
 def run_simulations(args):
 
     global instance_names
-    global cmd
-    global parameter_string_template
+    global call_template
     global cmd_builder_script
+    global cmd_builder_cache
+    global status_patterns
+    global output_tail_kb
+    global drop_model_lines
+    global cutoff
+    global memory_limit
+    global result_cache_file
+    global staging_dir
+    global staging_size_mb
+    global core_lock_dir
+    global cores_per_run
+    global skip_smt
+    global reserved_cores
+    global telemetry_interval
+    global kill_grace
+    global journal_file
+    global default_runtimes_file
     
     # parse the arguments, find the instances and read the pcs file
     options = parse_args(args)
 
+    if options['status_regex']:
+        try:
+            status_patterns = parse_status_patterns(options['status_regex'])
+        except (ValueError, re.error) as e:
+            logging.error("Could not parse the status patterns: %s" % (e))
+            sys.exit(3)
+    output_tail_kb = options['output_tail']
+    drop_model_lines = options['drop_model_lines']
+    cutoff = options['cutoff']
+    memory_limit = options['memory']
+    kill_grace = options['kill_grace']
+
+    if options['pin_cores']:
+        core_lock_dir = options['core_lock_dir']
+        if core_lock_dir is None:
+            core_lock_dir = os.path.join(tempfile.gettempdir(),
+                                         "spysmac_cores_%d" % (os.getuid()))
+        cores_per_run = options['cores_per_run']
+        skip_smt = options['skip_smt']
+        try:
+            reserved_cores = tuple(parse_cpu_list(options['reserve_cores']))
+            # compute the slots (and create the lock directory) before any run
+            allocator = CoreAllocator(core_lock_dir, cores_per_run, skip_smt, reserved_cores)
+        except ValueError as e:
+            logging.error("Could not set up the core pinning: %s" % (e))
+            sys.exit(3)
+        logging.info("Core pinning: %d slots %s" % (len(allocator.slots), allocator.slots))
+        if len(allocator.slots) < options['num_procs']:
+            logging.warn("Only %d CPU slots for %d parallel runs; runs will wait "
+                         "for free CPUs" % (len(allocator.slots), options['num_procs']))
+
     cmd_builder_script = options['cmd_builder_script']
+    cmd_builder_cache = options['cmd_builder_cache']
+    if cmd_builder_script is not None:
+        # load (and validate) the builder before any run is issued
+        try:
+            builder = get_cmd_builder(cmd_builder_script, cmd_builder_cache)
+        except (IOError, SyntaxError, ValueError) as e:
+            logging.error("Could not load the command line builder: %s" % (e))
+            sys.exit(3)
+        logging.info("Loaded command line builder %s in %.4f sec"
+                     % (builder.script, builder.load_time))
 
     logging.info("Setting up simulations in '%s'"%options['outputdir'])
 
-    instance_names = find_instances(options['training_instances'])
+    # make sure that the output directory exists
+    try:
+        os.makedirs(options['outputdir'])
+    except OSError as exception:
+        if exception.errno != errno.EEXIST:
+            raise
+
+    journal_start = 0
+    if not options['no_run_journal']:
+        journal_file = os.path.join(options['outputdir'], 'run_journal.jsonl')
+        if os.path.isfile(journal_file):
+            journal_start = os.path.getsize(journal_file)
+
+    if options['telemetry'] is not None:
+        if journal_file is None:
+            logging.error("--telemetry is written to the run journal; "
+                          "do not use it with --no-run-journal")
+            sys.exit(3)
+        telemetry_interval = options['telemetry']
+
+    manifest_file = options['instance_manifest']
+    if manifest_file is None:
+        manifest_file = os.path.join(options['outputdir'], 'instances.manifest')
+    manifest = InstanceManifest(manifest_file, num_threads=options['scan_threads'])
+
+    instance_names = find_instances(options['training_instances'], manifest)
     # in case the validation-fraction option is used    
-    if options['validation_instances'] is None:
-        instance_names = find_instances(options['training_instances'])
+    if options['validation_instances'] is None and options['split'] == "stratified":
+        train_instances, test_instances = stratified_instance_split(options, instance_names, manifest)
+        num_train_instances = len(train_instances)
+        num_test_instances = len(test_instances)
+        instance_names = train_instances + test_instances
+    elif options['validation_instances'] is None:
         random.shuffle(instance_names)
 
         num_test_instances = int(len(instance_names) * options['validation_fraction'])
         num_train_instances= len(instance_names) - num_test_instances
     else: # if a specific set of validation instances was specified
-        test_instances = find_instances(options['validation_instances'])
+        test_instances = find_instances(options['validation_instances'], manifest)
         num_train_instances = len(instance_names)
         num_test_instances  = len(test_instances)
         instance_names = instance_names + test_instances
@@ -292,27 +1056,84 @@ def run_simulations(args):
                       "the instances you provided!")
         sys.exit(2)
 
+    manifest.save()
+
+    # pysmac (and numpy) are imported only now, such that -h, wrong arguments
+    # and the wrapper processes of benchmarks/wrapper_overhead.py start fast
+    import pysmac
+    import pysmac.optimizer
+    import pysmac.utils
 
     param_dict, conditions, forbiddens = pysmac.utils.read_pcs(options['pcs'])
 
     logging.debug("Params: %s" % (str(list(param_dict.keys()))))
     logging.debug("Params: %s" % (str(param_dict)))
 
-    parameter_string_template = ("%s" % options['prefix']) +\
-        '%s' + ('%s' % options['separator']) + '%s'
-    cmd = "%s %s" % (options['binary'], options['callstring'])
+    # compile the call string once; every run only fills in the slots
+    try:
+        call_template = CallStringTemplate(options['binary'],
+                                           options['callstring'],
+                                           prefix=options['prefix'],
+                                           separator=options['separator'])
+    except ValueError as e:
+        logging.error("Could not parse the call string: %s" % (e))
+        sys.exit(3)
 
     smac_debug = False if options['verbosity'] != 'DEBUG' else True
 
+    if options['result_cache'] or options['warm_start']:
+        result_cache_file = os.path.join(options['outputdir'], 'run_results.sqlite')
+        # create the database before any worker process is forked; results of
+        # another solver or command line are neither reused nor imported
+        fingerprint = command_fingerprint([options['binary'], options['cmd_builder_script']],
+                                          [options['callstring'], options['prefix'],
+                                           options['separator'], options['status_regex']])
+        cache = RunResultCache(result_cache_file, fingerprint)
+        for warm_start_dir in options['warm_start'] or []:
+            db_file = os.path.join(warm_start_dir, 'run_results.sqlite')
+            if os.path.isfile(db_file) and os.path.abspath(db_file) != os.path.abspath(result_cache_file):
+                logging.info("Imported %d run results from %s"
+                             % (cache.import_results(db_file), db_file))
+        hits_before, misses_before = cache.hit_rate()
+        cache.close()
+
+    if options['stage_instances'] is not None:
+        staging_dir = options['stage_instances']
+        staging_size_mb = options['stage_size']
+        # create the directory and its index before any worker process is forked
+        InstanceStager(staging_dir, staging_size_mb).close()
+
+    if options['validate']:
+        validate_configurations(options, instance_names[num_train_instances:], manifest)
+        log_builder_latency(journal_start)
+        return
+
+    if options['prefilter']:
+        classes = prefilter_instances(options, instance_names, num_train_instances, manifest)
+        log_builder_latency(journal_start)
+        if all(classes[inst] != "kept" for inst in instance_names[:num_train_instances]):
+            logging.error("No training instances are left for the configuration")
+            return 1
+        return
+
+    initial_incumbent = None
+    if options['successive_halving'] and (options['seed'] > 0 or options['sh_only']):
+        initial_incumbent = successive_halving_incumbent(options,
+                                                         instance_names[:num_train_instances],
+                                                         manifest)
+        if options['sh_only']:
+            log_builder_latency(journal_start)
+            return
+    elif options['warm_start'] and options['seed'] > 0:
+        initial_incumbent = warm_start_incumbent(options,
+                                                 instance_names[:num_train_instances],
+                                                 manifest)
+
     # for the special seed 0, 
     if options['seed'] == 0:
+        # the default runtimes can stratify the splits of later runs
+        default_runtimes_file = os.path.join(options['outputdir'], 'default_runtimes.txt')
 
-        # make sure that the output directory exists
-        try:
-            os.makedirs(options['outputdir'])
-        except OSError as exception:
-            if exception.errno != errno.EEXIST:
-                raise
         # store meta information in a file for the report        
         with open(os.path.join(options['outputdir'], 'spysmac.meta'),'w') as fh:
             
@@ -320,21 +1141,26 @@ def run_simulations(args):
             fh.write("os system = {}\n".format(platform.system()))
             fh.write("os release = {}\n".format(platform.release()))
             
-            # cpu info
-            info = get_cpu_info()
+            # cpu info (cached per host until the next reboot)
+            info = get_host_info()
             fh.write("cpu vendor = {}\n".format(info['vendor_id']))
             fh.write("cpu brand = {}\n".format(info['brand']))
             fh.write("cpu hz = {}\n".format(info['hz_advertised']))
             fh.write("cpu arch = {}\n".format(info['arch']))
             fh.write("cpu count = {}\n".format(info['count']))
+            for (k, name) in [("cores", "cpu cores"), ("sockets", "cpu sockets"),
+                              ("l2_cache_size", "cpu l2 cache"), ("l3_cache_size", "cpu l3 cache"),
+                              ("mem_total_kb", "memory (kB)")]:
+                if info.get(k) is not None:
+                    fh.write("{} = {}\n".format(name, info[k]))
             
             # spysmacs run options
             for (k,v) in list(options.items()):
                 fh.write("{} = {}\n".format(k,v))
 
-	    # pcs information
-	    for key in param_dict.keys():
-	    	fh.write("%s = %s\n" % (key, param_dict[key][1]))
+            # pcs information
+            for key in param_dict.keys():
+                fh.write("%s = %s\n" % (key, param_dict[key][1]))
         
         # make sure no time is wasted and go directly to the validation
         options['repetitions'] = 1
@@ -352,6 +1178,8 @@ def run_simulations(args):
     smac.smac_options['overall_obj']='MEAN10'
     if options['seed'] == 0:
         smac.smac_options['scenario_fn'] = 'default_validation_scenario.dat'
+    if initial_incumbent is not None:
+        smac.smac_options['initial-incumbent'] = format_configuration(initial_incumbent)
 
 
     with open(os.path.join(options['outputdir'],'shuffled_instances.txt'),'w') as fh:
@@ -368,5 +1196,14 @@ def run_simulations(args):
                         mem_limit_function_mb=options['memory'],
                         t_limit_function_s=options['cutoff'])
 
+    if result_cache_file is not None:
+        cache = RunResultCache(result_cache_file)
+        hits, misses = cache.hit_rate()
+        cache.close()
+        hits, misses = hits - hits_before, misses - misses_before
+        logging.info("Result cache: %d hits, %d misses (hit rate %.1f%%)"
+                     % (hits, misses, 100. * hits / max(hits + misses, 1)))
+    log_builder_latency(journal_start)
+
 if __name__ == "__main__":
     sys.exit(run_simulations(sys.argv))
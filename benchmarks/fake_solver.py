@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# encoding: utf-8
+'''
+fake_solver -- stand-in for a SAT solver to benchmark the SpySMAC wrapper
+
+usage: fake_solver.py [-name=value ...] <instance> [<seed>]
+
+The solver sleeps or spins for a runtime sampled from an exponential
+distribution and prints a SAT or UNSAT line; the answer only depends on the
+instance name. Parameters of the configuration are accepted and ignored,
+except for
+
+    -fake-runtime=<sec>     mean of the sampled runtime (default: 0.01)
+    -fake-mode=sleep|spin   wait passively or burn CPU time (default: spin)
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import sys
+import time
+import random
+import zlib
+
+
+def main(argv):
+    params = {}
+    positional = []
+    for arg in argv[1:]:
+        if arg.startswith("-") and "=" in arg:
+            name, value = arg.lstrip("-").split("=", 1)
+            params[name] = value
+        else:
+            positional.append(arg)
+    if not positional:
+        sys.stderr.write(__doc__)
+        return 1
+
+    instance = positional[0]
+    seed = int(positional[1]) if len(positional) > 1 else 0
+    mean = float(params.get("fake-runtime", 0.01))
+    mode = params.get("fake-mode", "spin")
+
+    rng = random.Random(zlib.crc32(instance.encode("utf-8")) + seed)
+    runtime = rng.expovariate(1. / mean) if mean > 0 else 0.
+
+    start = time.time()
+    if mode == "sleep":
+        time.sleep(runtime)
+    else:
+        # user CPU time is what the wrapper measures
+        while time.time() - start < runtime:
+            pass
+
+    print("c fake solver, instance %s, seed %d, runtime %.4f" % (instance, seed, runtime))
+    if zlib.crc32(instance.encode("utf-8")) % 2:
+        print("s SATISFIABLE")
+    else:
+        print("s UNSATISFIABLE")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
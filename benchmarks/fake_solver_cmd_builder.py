@@ -0,0 +1,26 @@
+#!/usr/local/bin/python2.7
+# encoding: utf-8
+'''
+fake_solver_cmd_builder -- commandline call builder script for benchmarks/fake_solver.py
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+def get_command_line_cmd(runargs, conf_dict):
+    '''
+    Args:
+        runargs = {   
+                    "instance": path to the instance,
+                    "seed" : seed,
+                    "binary" : path to fake_solver.py
+                  }
+        conf_dict: mapping param_name -> value
+    '''
+    cmd = [runargs["binary"]]
+    for name, value in sorted(conf_dict.items()):
+        cmd.append("-%s=%s" % (name, value))
+    cmd.append(runargs["instance"])
+    cmd.append(str(runargs["seed"]))
+    return cmd
@@ -0,0 +1,95 @@
+#!/usr/local/bin/python2.7
+# encoding: utf-8
+'''
+import_time -- measures the startup latency of the SpySMAC entry points
+
+Starts SpySMAC_run.py -h, SpySMAC_analyze.py -h and a bare import of
+SpySMAC_run (as done by benchmarks/wrapper_overhead.py) several times in fresh
+interpreters and reports the wall clock times. Interpreters that support
+-X importtime (Python >= 3.7) additionally report the slowest imports.
+
+example:
+    python benchmarks/import_time.py --repeats 20 --top 15
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import sys
+import time
+import subprocess
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+benchmark_path = os.path.dirname(os.path.realpath(__file__))
+spysmac_path = os.path.dirname(benchmark_path)
+
+TARGETS = [("SpySMAC_run.py -h", [os.path.join(spysmac_path, "SpySMAC_run.py"), "-h"]),
+           ("SpySMAC_analyze.py -h", [os.path.join(spysmac_path, "SpySMAC_analyze.py"), "-h"]),
+           ("import SpySMAC_run", ["-c", "import SpySMAC_run"])]
+
+
+def start_once(python, args, extra=()):
+    '''
+        runs the interpreter once and returns (wall time, stderr)
+    '''
+    start = time.time()
+    proc = subprocess.Popen([python] + list(extra) + args, cwd=spysmac_path,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, err = proc.communicate()
+    elapsed = time.time() - start
+    if proc.returncode != 0:
+        sys.stderr.write(err.decode("utf-8", "replace"))
+        raise RuntimeError("%s failed with exit code %d" % (" ".join(args), proc.returncode))
+    return elapsed, err.decode("utf-8", "replace")
+
+
+def slowest_imports(stderr, top):
+    '''
+        parses the output of -X importtime and returns the <top> imports with the
+        largest cumulative time as list of (cumulative us, self us, module)
+    '''
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            imports.append((int(fields[1]), int(fields[0]), fields[2].rstrip()))
+        except (IndexError, ValueError):
+            continue  # header line
+    return sorted(imports, reverse=True)[:top]
+
+
+def main(argv):
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter,
+                            description="Benchmark of the startup latency of SpySMAC")
+    parser.add_argument("--repeats", default=10, type=int, help="starts per entry point")
+    parser.add_argument("--python", default=sys.executable, help="interpreter to benchmark")
+    parser.add_argument("--top", default=10, type=int,
+                        help="number of slowest imports to list (-X importtime only)")
+    options = vars(parser.parse_args(argv[1:]))
+
+    # -X importtime is not known to Python 2
+    probe = subprocess.Popen([options['python'], "-X", "importtime", "-c", "pass"],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    importtime = b"import time:" in probe.communicate()[1]
+
+    print("%-22s %9s %9s %9s" % ("entry point", "min ms", "median ms", "max ms"))
+    for name, args in TARGETS:
+        times = sorted(start_once(options['python'], args)[0] for _ in range(options['repeats']))
+        print("%-22s %9.1f %9.1f %9.1f" % (name, 1000 * times[0],
+                                           1000 * times[len(times) // 2], 1000 * times[-1]))
+
+    if importtime and options['top'] > 0:
+        for name, args in TARGETS:
+            _, err = start_once(options['python'], args, extra=["-X", "importtime"])
+            print("\nslowest imports of %s (cumulative / self ms)" % (name))
+            for cumulative, self_time, module in slowest_imports(err, options['top']):
+                print("%9.1f %9.1f  %s" % (cumulative / 1000., self_time / 1000., module))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,125 @@
+#!/usr/local/bin/python2.7
+# encoding: utf-8
+'''
+stats_kernel -- compares the report statistics of SpySMAC/utils/runtime_stats.py
+with the former element-wise implementations
+
+Draws synthetic runtimes of a default and a configured solver (with timeouts
+and ties), computes PAR1/PAR10/timeouts, the better/equal/worse counts and
+the CDF once with the NumPy kernel and once with the Python loops that were
+used by SpySMAC_analyze.py and SpySMAC_create_tex.py, checks that both agree
+and reports their run times.
+
+example:
+    python benchmarks/stats_kernel.py --instances 1000000
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import sys
+import time
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+import numpy as np
+
+benchmark_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(benchmark_path))
+
+from SpySMAC.utils.runtime_stats import get_stats, get_cdf
+
+
+def loop_stats(baseline, configured, cutoff):
+    '''
+        former get_stats of SpySMAC_analyze.py plus the counting loop of SpySMAC_create_tex.py
+    '''
+    stats = {"base": {
+                      "par1": sum([cutoff if x >= cutoff else x for x in baseline]) / len(baseline),
+                      "par10": sum([10*cutoff if x >= cutoff else x for x in baseline]) / len(baseline),
+                      "tos": sum([1 if x >= cutoff else 0 for x in baseline]),
+                      },
+             "conf": {
+                      "par1": sum([cutoff if x >= cutoff else x for x in configured]) / len(configured),
+                      "par10": sum([10*cutoff if x >= cutoff else x for x in configured]) / len(configured),
+                      "tos": sum([1 if x >= cutoff else 0 for x in configured]),
+                      },
+             "n" :  len(configured)
+             }
+    better, equal, worse = 0, 0, 0
+    for i in range(len(baseline)):
+        if baseline[i] > configured[i]:
+            better += 1
+        elif baseline[i] == configured[i]:
+            equal += 1
+        else:
+            worse += 1
+    stats.update({"better": better, "equal": equal, "worse": worse})
+    return stats
+
+
+def loop_cdf(data, cutoff):
+    '''
+        former get_cdf_x_y of SpySMAC_analyze.py
+    '''
+    b_x, b_y, i_s = [], [], 0
+    for i, x in enumerate(np.sort(data)):
+        b_x.append(x)
+        if x < cutoff:
+            b_y.append(float(i) /len(data))
+            i_s = i
+        else:
+            b_y.append(float(i_s) /len(data))
+    return b_x, b_y
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+def main(argv):
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter,
+                            description="Benchmark of the statistics of the SpySMAC report")
+    parser.add_argument("--instances", default=1000000, type=int, help="number of instances")
+    parser.add_argument("--cutoff", default=300., type=float, help="runtime cutoff (sec)")
+    parser.add_argument("--seed", default=1, type=int, help="random seed")
+    options = vars(parser.parse_args(argv[1:]))
+
+    rng = np.random.RandomState(options['seed'])
+    cutoff = options['cutoff']
+    baseline = np.minimum(rng.exponential(cutoff / 3., options['instances']), cutoff)
+    configured = np.minimum(baseline * rng.lognormal(-0.5, 1., options['instances']), cutoff)
+    # ties on a tenth of the instances besides the joint timeouts
+    ties = rng.rand(options['instances']) < 0.1
+    configured[ties] = baseline[ties]
+
+    # the report computes the statistics and both CDFs for training and test
+    # instances; one instance set is enough for the comparison
+    kernels = [("stats + counts", lambda: get_stats(baseline, configured, cutoff),
+                lambda: loop_stats(baseline, configured, cutoff)),
+               ("CDF (2 curves)", lambda: (get_cdf(baseline, cutoff), get_cdf(configured, cutoff)),
+                lambda: (loop_cdf(baseline, cutoff), loop_cdf(configured, cutoff)))]
+
+    print("%-16s %12s %12s %9s" % ("kernel", "loops sec", "numpy sec", "speedup"))
+    for name, vectorized, loops in kernels:
+        loop_time, expected = timed(loops)
+        numpy_time, result = timed(vectorized)
+        if name.startswith("stats"):
+            for split in ("base", "conf"):
+                for key in ("par1", "par10", "tos"):
+                    assert np.isclose(expected[split][key], result[split][key]), (split, key)
+            for key in ("n", "better", "equal", "worse"):
+                assert expected[key] == result[key], key
+        else:
+            for (x, y), (ex, ey) in zip(result, expected):
+                assert np.array_equal(x, ex) and np.allclose(y, ey)
+        print("%-16s %12.3f %12.3f %8.1fx" % (name, loop_time, numpy_time,
+                                              loop_time / max(numpy_time, 1e-9)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,140 @@
+#!/usr/local/bin/python2.7
+# encoding: utf-8
+'''
+wrapper_overhead -- measures how fast the SpySMAC wrapper turns around runs
+
+Runs sat_function of SpySMAC_run.py with benchmarks/fake_solver.py as solver,
+once with the call string (--callstring) and once with a command line builder
+script (--cmd_builder_script), and reports the throughput, latency percentiles
+and the CPU time the wrapper itself needs per run.
+
+example:
+    python benchmarks/wrapper_overhead.py --runs 2000 --num-procs 4 --runtime 0.001
+
+@copyright:  2015 AAD Group Freiburg. All rights reserved.
+
+@license:   GPLv2
+'''
+
+import os
+import sys
+import time
+import shutil
+import resource
+import tempfile
+import multiprocessing
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+benchmark_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(benchmark_path))
+
+import SpySMAC_run as spysmac_run
+from SpySMAC.utils.call_string import CallStringTemplate
+
+FAKE_SOLVER = os.path.join(benchmark_path, "fake_solver.py")
+FAKE_BUILDER = os.path.join(benchmark_path, "fake_solver_cmd_builder.py")
+
+
+def percentile(values, q):
+    '''
+        returns the q-th percentile (0 <= q <= 100) of a sorted list
+    '''
+    if not values:
+        return float("nan")
+    index = min(int(round(q / 100. * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def timed_run(args):
+    '''
+        runs sat_function once and returns (latency, CPU time of the wrapper)
+    '''
+    instance, seed, config = args
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.time()
+    spysmac_run.sat_function(instance=instance, seed=seed, **config)
+    latency = time.time() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    return latency, (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+
+def benchmark(path, options, workdir):
+    '''
+        runs options['runs'] runs through the call string ('callstring') or
+        the command line builder ('builder') and returns the statistics
+    '''
+    spysmac_run.instance_names = [os.path.join(workdir, "instance_%d.cnf" % (i))
+                                  for i in range(options['num_instances'])]
+    spysmac_run.call_template = CallStringTemplate(FAKE_SOLVER, "<params> <instance> <seed>",
+                                                   prefix="-", separator="=")
+    spysmac_run.cmd_builder_script = FAKE_BUILDER if path == "builder" else None
+    spysmac_run.cutoff = 10.
+    spysmac_run.journal_file = None
+    if options['journal']:
+        spysmac_run.journal_file = os.path.join(workdir, "run_journal_%s.jsonl" % (path))
+
+    config = {"fake-runtime": options['runtime'], "fake-mode": options['mode']}
+    for i in range(options['num_params']):
+        config["param_%d" % (i)] = str(i)
+    jobs = [(i, i, config) for i in range(options['runs'])]
+
+    # the workers are forked after the wrapper was set up, as by pysmac
+    pool = multiprocessing.Pool(options['num_procs'])
+    try:
+        start = time.time()
+        results = list(pool.imap_unordered(timed_run, jobs))
+        elapsed = time.time() - start
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    latencies = sorted(latency for latency, _ in results)
+    wrapper_cpu = sum(cpu for _, cpu in results) / len(results)
+    return {"runs/s": len(results) / elapsed,
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1],
+            "cpu": wrapper_cpu}
+
+
+def main(argv):
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter,
+                            description="Benchmark of the SpySMAC wrapper overhead")
+    parser.add_argument("--runs", default=500, type=int, help="runs per path")
+    parser.add_argument("-n", "--num-procs", default=1, type=int,
+                        help="number of parallel wrapper processes")
+    parser.add_argument("--runtime", default=0.005, type=float,
+                        help="mean runtime of the fake solver (sec)")
+    parser.add_argument("--mode", default="spin", choices=["spin", "sleep"],
+                        help="the fake solver burns CPU time or sleeps")
+    parser.add_argument("--num-instances", default=100, type=int,
+                        help="number of (fake) instances")
+    parser.add_argument("--num-params", default=20, type=int,
+                        help="number of additional (ignored) parameters per run")
+    parser.add_argument("--path", default="both", choices=["callstring", "builder", "both"],
+                        help="wrapper path to benchmark")
+    parser.add_argument("--journal", default=False, action="store_true",
+                        help="write the run journal (as SpySMAC_run.py does by default)")
+    options = vars(parser.parse_args(argv[1:]))
+
+    paths = ["callstring", "builder"] if options['path'] == "both" else [options['path']]
+    workdir = tempfile.mkdtemp(prefix="spysmac_bench_")
+    try:
+        print("%-10s %9s %9s %9s %9s %9s %12s" % ("path", "runs/s", "p50 ms", "p90 ms",
+                                                  "p99 ms", "max ms", "wrapper ms"))
+        for path in paths:
+            stats = benchmark(path, options, workdir)
+            print("%-10s %9.1f %9.2f %9.2f %9.2f %9.2f %12.3f" % (
+                path, stats["runs/s"], 1000 * stats["p50"], 1000 * stats["p90"],
+                1000 * stats["p99"], 1000 * stats["max"], 1000 * stats["cpu"]))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
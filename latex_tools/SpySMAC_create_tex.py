@@ -33,12 +33,18 @@ def SpySMAC_create_tex(solver_name, meta, incumbent, test_perf, training_perf,
 					are two further dictionaries. One for the base configuration
 					and one for the optimized configuration. And furthermore 
 					the key-value pair for the amount of test instances. 	
+					The keys better, equal and worse count the instances
+					on which the optimized configuration is faster, as fast
+					or slower (see SpySMAC/utils/runtime_stats.py).
 
 		training_perf (dict):	In this dictionary are the PAR10 scores, average runtimes,
 					and timeout for the training instances. Inside this dictionary 
 					are two further dictionaries. One for the base configuration
 					and one for the optimized configuration. And furthermore 
 					the key-value pair for the amount of training instances.
+					The keys better, equal and worse count the instances
+					on which the optimized configuration is faster, as fast
+					or slower (see SpySMAC/utils/runtime_stats.py).
 
 		param_imp_def (list):   Contains the importance of each parameter estimated by fANOVA. 
 					Therefore fANOVA only considered parameter settings, which were
@@ -103,6 +109,9 @@ def SpySMAC_create_tex(solver_name, meta, incumbent, test_perf, training_perf,
 
     """
 
+    # the order of the meta data depends on the run options; look them up by name
+    meta_dict = dict(reversed(meta))
+
     # Load the text dictionary out of the json file
     with open("latex_tools/text_dictionary.json") as json_file:
         json_data = json.load(json_file)
@@ -143,34 +152,34 @@ def SpySMAC_create_tex(solver_name, meta, incumbent, test_perf, training_perf,
         texfile.write("Solver &	%s \\\\ \n" % (solver_name))
 	texfile.write("\\hline \n")
 	
-	texfile.write("Number of training instances & %s \\\\ \n" % (meta[1][1]))
+	texfile.write("Number of training instances & %s \\\\ \n" % (meta_dict["#Instances (Train)"]))
 	texfile.write("\\hline \n")
 
-	texfile.write("Number of test instances & %s \\\\ \n" % (meta[0][1]))
+	texfile.write("Number of test instances & %s \\\\ \n" % (meta_dict["#Instances (Test)"]))
         texfile.write("\\hline \n")	
 
-	texfile.write("Operating System & %s %s \\\\ \n" % (meta[2][1], meta[3][1]))
+	texfile.write("Operating System & %s %s \\\\ \n" % (meta_dict["os system"], meta_dict["os release"]))
         texfile.write("\\hline \n")
 
-	texfile.write("CPU & %s \\\\ \n" % (meta[5][1]))
+	texfile.write("CPU & %s \\\\ \n" % (meta_dict["cpu brand"]))
         texfile.write("\\hline \n")
 
-	texfile.write("Number of CPU cores & %s \\\\ \n" % (meta[8][1]))
+	texfile.write("Number of CPU cores & %s \\\\ \n" % (meta_dict["cpu count"]))
         texfile.write("\\hline \n")
 
-	texfile.write("Runtime cutoff of target algorithm run in seconds & %s \\\\ \n" % (meta[10][1]))
+	texfile.write("Runtime cutoff of target algorithm run in seconds & %s \\\\ \n" % (meta_dict["cutoff"]))
         texfile.write("\\hline \n")
 
-	texfile.write("Memory limit of target algorithm run in megabytes & %s \\\\ \n" % (meta[9][1]))
+	texfile.write("Memory limit of target algorithm run in megabytes & %s \\\\ \n" % (meta_dict["memory"]))
 	texfile.write("\\hline \n")
 
-	texfile.write("Independent SMAC runs & %s  \\\\ \n" % (meta[16][1]))
+	texfile.write("Independent SMAC runs & %s  \\\\ \n" % (meta_dict["repetitions"]))
 	texfile.write("\\hline \n")
 
-	texfile.write("Configuration budget in seconds & %s \\\\ \n" % (meta[17][1]))
+	texfile.write("Configuration budget in seconds & %s \\\\ \n" % (meta_dict["budget"]))
 	texfile.write("\\hline \n")
 
-	texfile.write("Used CPU cores & %s \\\\ \n" % (meta[18][1]))
+	texfile.write("Used CPU cores & %s \\\\ \n" % (meta_dict["num_procs"]))
 	texfile.write("\\hline \n")
 
         texfile.write("\\end{tabular} \n")
@@ -214,30 +223,14 @@ def SpySMAC_create_tex(solver_name, meta, incumbent, test_perf, training_perf,
 
         texfile.write("\\FloatBarrier \n")
 
-        # Quantity calculation
-        baseline_train_greater_than_incumbent_train = 0
-        baseline_train_equal_incumbent_train = 0
-        baseline_train_less_than_incumbent_train = 0
-
-        baseline_test_greater_than_incumbent_test = 0
-        baseline_test_equal_incumbent_test = 0
-        baseline_test_less_than_incumbent_test = 0
-
-        for i in range(len(baseline_train)):
-          if baseline_train[i] > incumbent_train[i]:
-            baseline_train_greater_than_incumbent_train += 1
-          elif baseline_train[i] == incumbent_train[i]:
-            baseline_train_equal_incumbent_train += 1
-          else:
-            baseline_train_less_than_incumbent_train += 1
-
-        for i in range(len(baseline_test)):
-          if baseline_test[i] > incumbent_test[i]:
-            baseline_test_greater_than_incumbent_test += 1
-          elif baseline_test[i] == incumbent_test[i]:
-            baseline_test_equal_incumbent_test += 1
-          else:
-            baseline_test_less_than_incumbent_test += 1
+        # Quantity calculation (counted by SpySMAC/utils/runtime_stats.py)
+        baseline_train_greater_than_incumbent_train = training_perf["better"]
+        baseline_train_equal_incumbent_train = training_perf["equal"]
+        baseline_train_less_than_incumbent_train = training_perf["worse"]
+
+        baseline_test_greater_than_incumbent_test = test_perf["better"]
+        baseline_test_equal_incumbent_test = test_perf["equal"]
+        baseline_test_less_than_incumbent_test = test_perf["worse"]
       
 	if baseline_train_equal_incumbent_train > 0:
         	texfile.write("%s \\\\ \n" % (json_data["quantity_result_train"].replace("$<$baseline_train_less_than_incumbent_train$>$",
@@ -287,9 +280,9 @@ def SpySMAC_create_tex(solver_name, meta, incumbent, test_perf, training_perf,
         texfile.write("\\hline \n")
         texfile.write("%s & $%s$ & $%s$ \n" % (json_data["table_entries"]["algorithm_timeouts"],
                                                str(training_perf['base']['tos']) +
-                                               "/" + str(meta[0][1]),
+                                               "/" + str(meta_dict["#Instances (Test)"]),
                                                str(training_perf['conf']['tos']) +
-                                               "/" + str(meta[1][1])))
+                                               "/" + str(meta_dict["#Instances (Train)"])))
         texfile.write("\\end{tabular} \n")
         texfile.write("\\end{table} \n")
 
@@ -313,8 +306,8 @@ def SpySMAC_create_tex(solver_name, meta, incumbent, test_perf, training_perf,
         texfile.write("\\hline \n")
         texfile.write("%s & $%s$ & $%s$ \n" % (json_data["table_entries"]["algorithm_timeouts"],
                                                str(test_perf['base']['tos']) + "/" +
-                                               str(meta[0][1]), str(test_perf['conf']['tos']) +
-                                               "/" + str(meta[1][1])))
+                                               str(meta_dict["#Instances (Test)"]), str(test_perf['conf']['tos']) +
+                                               "/" + str(meta_dict["#Instances (Train)"])))
         texfile.write("\\end{tabular} \n")
         texfile.write("\\end{table} \n")
 
@@ -369,18 +362,18 @@ def SpySMAC_create_tex(solver_name, meta, incumbent, test_perf, training_perf,
 			i = i + 1
 			j = j + 1
 		if (i < j):
-			if (float(cdf_values_incumbent_training[0][j]) == float(meta[10][1])):
+			if (float(cdf_values_incumbent_training[0][j]) == float(meta_dict["cutoff"])):
 				break
 			if (betterOneListTraining[len(betterOneListTraining) - 1][0] != "optimized"):
 				betterOneListTraining.append(("optimized", cdf_values_baseline_training[0][i], cdf_values_incumbent_training[0][j]))
 			
 		elif (i > j):
-			if (float(cdf_values_baseline_training[0][j]) == float(meta[10][1])):
+			if (float(cdf_values_baseline_training[0][j]) == float(meta_dict["cutoff"])):
 				break
 			if (betterOneListTraining[len(betterOneListTraining) - 1][0] != "default"):
 				betterOneListTraining.append(("default", cdf_values_baseline_training[0][i], cdf_values_incumbent_training[0][j]))
 		else:
-			if (float(min(cdf_values_baseline_training[0][i], cdf_values_incumbent_training[0][j])) == float(meta[10][1])):
+			if (float(min(cdf_values_baseline_training[0][i], cdf_values_incumbent_training[0][j])) == float(meta_dict["cutoff"])):
 				break
 
 	i = 0
@@ -399,18 +392,18 @@ def SpySMAC_create_tex(solver_name, meta, incumbent, test_perf, training_perf,
 			i = i + 1
 			j = j + 1
 		if (i < j):
-			if (float(cdf_values_incumbent_test[0][j]) == float(meta[10][1])):
+			if (float(cdf_values_incumbent_test[0][j]) == float(meta_dict["cutoff"])):
 				break
 			if (betterOneListTest[len(betterOneListTest) - 1][0] != "optimized"):
 				betterOneListTest.append(("optimized", cdf_values_baseline_test[0][i], cdf_values_incumbent_test[0][j]))
 			
 		elif (i > j):
-			if (float(cdf_values_baseline_test[0][j]) == float(meta[10][1])):
+			if (float(cdf_values_baseline_test[0][j]) == float(meta_dict["cutoff"])):
 				break
 			if (betterOneListTest[len(betterOneListTest) - 1][0] != "default"):
 				betterOneListTest.append(("default", cdf_values_baseline_test[0][i], cdf_values_incumbent_test[0][j]))
 		else:
-			if (float(min(cdf_values_baseline_test[0][i], cdf_values_incumbent_test[0][j])) == float(meta[10][1])):
+			if (float(min(cdf_values_baseline_test[0][i], cdf_values_incumbent_test[0][j])) == float(meta_dict["cutoff"])):
 				break
 
         # Cumulative Distribution Function Plot for the test instances